@@ -0,0 +1,486 @@
+"""ASGI server mode for the VFD display API.
+
+Serves /api/welcome, /api/receive_order and /api/status like main.py, but as
+a plain ASGI application on one event loop, driving the display through
+AsyncVFD220 instead of a writer thread. It also serves live cart sessions
+over WebSocket (/api/cart, see cart.py). Run it with any ASGI server:
+
+    uvicorn asgi_app:app --port 8086
+    python asgi_app.py            # uses uvicorn if it is installed
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+from typing import Dict, List, Optional
+from vfd220 import SharedFrame, load_display_configs
+from vfd220_async import AsyncVFD220
+from vfd_manager import HEALTH_CHECK_INTERVAL, STATUS_TTL, reconnect_delay, link_snapshot, health_snapshot
+from vfd_framebuffer import SHARED_FRAMEBUFFER, SharedFramebuffer, read_screen
+from order_display import DISPLAY_TIMEOUT, validate_order_data, build_order_lines, to_date, format_money, welcome_lines
+from cart import Cart
+
+SERVER_PORT = int(os.getenv('SERVER_PORT', '8086'))
+
+
+def setup_logger() -> logging.Logger:
+    """Configure console logger for the ASGI server"""
+    logger = logging.getLogger(__name__)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+logger = setup_logger()
+
+
+class AsyncDisplayPipeline:
+    """Single-task display pipeline for the ASGI server.
+
+    Handlers only store the screen they want (latest wins) and wake the
+    render task, which owns the AsyncVFD220. The task also reverts orders to
+    the welcome screen after DISPLAY_TIMEOUT, checks link health and
+    reconnects with jittered exponential backoff, redrawing the current
+    screen once the display is back.
+    """
+
+    def __init__(self, vfd: Optional[AsyncVFD220] = None, name: str = "default"):
+        self.name = name
+        self._vfd = vfd or AsyncVFD220()
+        if SHARED_FRAMEBUFFER:
+            try:
+                self._vfd.vfd.shared_framebuffer = SharedFramebuffer.create(
+                    name, self._vfd.display_width, self._vfd.display_height)
+            except OSError as e:
+                logger.error(f"Could not create shared framebuffer for VFD {name}: {e}")
+        self._dates = []
+        self._pending: Optional[tuple] = None  # next screen to draw
+        self._screen: Optional[tuple] = None  # screen currently shown
+        self._wake = asyncio.Event()
+        self._revert_handle: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._connected = False
+        self._link_state = "disconnected"
+        self._reconnect_attempts = 0
+        self._next_reconnect = 0.0
+        self._last_write_time: Optional[float] = None
+        self._health: Optional[Dict[str, object]] = None
+        self._health_time = 0.0
+        self.current_orders = 0
+
+    @property
+    def port(self) -> str:
+        return self._vfd.vfd.port
+
+    @property
+    def display_height(self) -> int:
+        return self._vfd.display_height
+
+    def start(self):
+        """Start the render task on the running loop (idempotent)"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # The flag ends the loop even if wait_for swallows the cancellation
+            # because the wake event fired at the same time (Python < 3.12)
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._vfd.disconnect()
+        if self._vfd.vfd.shared_framebuffer is not None:
+            self._vfd.vfd.shared_framebuffer.close()
+            self._vfd.vfd.shared_framebuffer = None
+
+    def display_welcome(self) -> bool:
+        """Show the welcome message (new customer)"""
+        self._dates.clear()
+        self._set_screen(("welcome", None))
+        return True
+
+    def display_order(self, order_items: List[Dict[str, str]]) -> bool:
+        """Show an order, unless an order with a later date was already shown"""
+        if not order_items:
+            logger.warning("No order items to display")
+            return False
+        date = order_items[0].get('date')
+        try:
+            # Orders without a date (e.g. single scans) skip the ordering check
+            if date:
+                date = to_date(date)
+                if any(date < seen for seen in self._dates):
+                    logger.warning("Order date is earlier than the last displayed order, skipping display")
+                    return False
+                self._dates.append(date)
+            lines = build_order_lines(order_items)
+        except Exception as e:
+            logger.error(f"Error displaying order: {e}")
+            return False
+        self.current_orders = len(order_items)
+        self._set_screen(("order", lines))
+        return True
+
+    def display_cart(self, lines: List[str], items: int) -> bool:
+        """Show the lines of a live cart session (no timeout while it is open)"""
+        self.current_orders = items
+        self._set_screen(("cart", lines))
+        return True
+
+    def end_cart(self, lines: List[str]):
+        """A cart session closed: back to welcome, unless something replaced its screen"""
+        screen = self._pending or self._screen
+        if screen is not None and screen[0] == "cart" and screen[1] is lines:
+            self.display_welcome()
+
+    def display_shared(self, shared: SharedFrame) -> bool:
+        """Show a broadcast frame shared with other displays (until replaced)"""
+        self._set_screen(("shared", shared))
+        return True
+
+    def _set_screen(self, screen: tuple):
+        self._pending = screen
+        self._wake.set()
+
+    def _revert_to_welcome(self):
+        """Timer callback: the order display timed out"""
+        self._revert_handle = None
+        logger.debug("Display timeout reached, reverting to welcome message")
+        self._set_screen(("welcome", None))
+
+    async def _run(self):
+        while not self._stopping:
+            if not self._connected:
+                await self._reconnect()
+                if not self._connected:
+                    await asyncio.sleep(max(0.0, self._next_reconnect - time.monotonic()))
+                    continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), HEALTH_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                if not self._vfd.is_connected():
+                    logger.warning(f"VFD {self.name} link lost, reconnecting in the background")
+                    self._link_down()
+                continue
+            self._wake.clear()
+            screen, self._pending = self._pending, None
+            if screen is not None:
+                await self._render(screen)
+
+    async def _render(self, screen: tuple):
+        kind, payload = screen
+        if self._revert_handle is not None:
+            self._revert_handle.cancel()
+            self._revert_handle = None
+        if kind == "welcome":
+            await self._vfd.send_multiline_text(welcome_lines(self._vfd.display_width, self._vfd.display_height))
+        elif kind == "shared":
+            await self._vfd.send_shared_frame(payload)
+        elif kind == "cart":
+            await self._vfd.send_multiline_text(payload)
+        else:
+            await self._vfd.send_multiline_text(payload)
+            self._revert_handle = asyncio.get_running_loop().call_later(DISPLAY_TIMEOUT, self._revert_to_welcome)
+        self._screen = screen
+        if self._vfd.is_connected():
+            self._last_write_time = time.time()
+        else:
+            logger.warning(f"VFD {self.name} link lost during write, reconnecting in the background")
+            self._link_down()
+
+    def _link_down(self):
+        self._connected = False
+        self._link_state = "disconnected"
+        self._reconnect_attempts = 0
+        self._next_reconnect = time.monotonic()
+
+    async def _reconnect(self):
+        """One reconnect attempt, rescheduling with jittered backoff"""
+        self._link_state = "connecting"
+        await self._vfd.disconnect()
+        if await self._vfd.connect():
+            self._connected = True
+            self._link_state = "connected"
+            self._reconnect_attempts = 0
+            logger.info(f"VFD {self.name} link up on {self.port}")
+            if self._pending is None and self._screen is not None:
+                self._set_screen(self._screen)
+            return
+
+        self._reconnect_attempts += 1
+        delay = reconnect_delay(self._reconnect_attempts)
+        self._link_state = "disconnected"
+        self._next_reconnect = time.monotonic() + delay
+        logger.warning(f"VFD {self.name} reconnect attempt {self._reconnect_attempts} failed, retrying in {delay:.1f}s")
+
+    def health(self) -> Dict[str, object]:
+        """Cached health snapshot; never touches the display"""
+        now = time.monotonic()
+        if self._health is None or now - self._health_time >= STATUS_TTL:
+            link = link_snapshot(self._link_state, self._connected, self._reconnect_attempts, self._next_reconnect)
+            self._health = health_snapshot(link, self._last_write_time, 0 if self._pending is None else 1)
+            self._health_time = now
+        return self._health
+
+
+# One pipeline (render task) per configured display
+pipelines: Dict[str, AsyncDisplayPipeline] = {
+    display_id: AsyncDisplayPipeline(AsyncVFD220(**config), name=display_id)
+    for display_id, config in load_display_configs().items()
+}
+default_display = next(iter(pipelines))
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type"),
+]
+
+
+async def send_json(send, status: int, payload: Dict[str, object]):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())] + CORS_HEADERS,
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive) -> bytes:
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+def select_pipeline(scope) -> Optional[AsyncDisplayPipeline]:
+    """Pipeline of the ?display=<id> query parameter (default: first display)"""
+    query = parse_qs(scope.get("query_string", b"").decode('latin-1'))
+    return pipelines.get(query.get("display", [default_display])[0])
+
+
+async def welcome(scope, receive, send, pipeline):
+    """API endpoint to display welcome message"""
+    if pipeline.display_welcome():
+        await send_json(send, 200, {"status": "success", "message": "Welcome message displayed"})
+    else:
+        await send_json(send, 500, {"status": "error", "message": "Failed to display welcome message"})
+
+
+async def receive_order(scope, receive, send, pipeline):
+    """API endpoint to receive and display orders"""
+    body = await read_body(receive)
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        await send_json(send, 400, {"error": "Invalid JSON"})
+        return
+    if not data:
+        await send_json(send, 400, {"error": "No data provided"})
+        return
+    if not validate_order_data(data):
+        await send_json(send, 400, {"error": "Invalid order data format"})
+        return
+
+    logger.debug(f"Received order: {len(data)} items")
+    if not pipeline.display_order(data):
+        logger.error("Failed to display order on VFD")
+    await send_json(send, 200, {"status": "success", "message": "Order displayed"})
+
+
+async def status(scope, receive, send, pipeline):
+    """API endpoint to check VFD status (no display I/O)"""
+    health = pipeline.health()
+    is_connected = bool(health["connected"])
+    response = {
+        "status": "success" if is_connected else "error",
+        "display": pipeline.name,
+        "vfd_connected": is_connected,
+        "current_orders": pipeline.current_orders,
+        "vfd": health
+    }
+    if SHARED_FRAMEBUFFER:
+        response["screen"] = read_screen(pipeline.name)
+    if not is_connected:
+        response["message"] = (
+            "VFD not connected. "
+            "Possible reasons: COM port in use, access denied, or hardware not present. "
+            f"Check that {pipeline.port} is available and not used by another program."
+        )
+    await send_json(send, 200 if is_connected else 500, response)
+
+
+async def broadcast(scope, receive, send, pipeline):
+    """API endpoint showing the same lines on a group of displays (default: all)"""
+    try:
+        data = json.loads(await read_body(receive) or b"null")
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not isinstance(data.get("lines"), list):
+        await send_json(send, 400, {"error": 'Expected {"lines": [...], "displays": [...]}'})
+        return
+
+    display_ids = data.get("displays") or list(pipelines)
+    unknown = [display_id for display_id in display_ids if display_id not in pipelines]
+    if unknown:
+        await send_json(send, 404, {"status": "error", "message": f"Unknown display: {', '.join(unknown)}",
+                                    "displays": list(pipelines)})
+        return
+
+    # Encoded once; the render tasks write it to their ports concurrently
+    shared = SharedFrame([str(line) for line in data["lines"]])
+    queued = {display_id: pipelines[display_id].display_shared(shared) for display_id in display_ids}
+    await send_json(send, 200, {"status": "success", "message": "Broadcast displayed", "displays": queued})
+
+
+async def list_displays(scope, receive, send, pipeline):
+    """API endpoint listing the configured displays and their health"""
+    await send_json(send, 200, {
+        "default": default_display,
+        "displays": {display_id: {"port": p.port, "vfd": p.health()} for display_id, p in pipelines.items()}
+    })
+
+
+async def cart_session(scope, receive, send, pipeline):
+    """WebSocket endpoint: one POS session streaming cart commands.
+
+    Each text message holds one or more command lines; the reply has one
+    line per command, "OK\t<lines>\t<total>" or "ERR\t<reason>" (a message
+    without commands gets none). The display is redrawn once per message.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    cart = Cart()
+    shown = None  # lines this session last displayed
+    logger.info(f"Cart session opened on {pipeline.name}")
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            if shown is not None:
+                pipeline.end_cart(shown)
+            logger.info(f"Cart session closed on {pipeline.name}")
+            return
+        if message["type"] != "websocket.receive":
+            continue
+        text = message.get("text")
+        if text is None:
+            text = (message.get("bytes") or b"").decode('utf-8', 'replace')
+        replies = []
+        screen = False  # nothing to redraw
+        for command in text.splitlines():
+            try:
+                screen = cart.apply(command, pipeline.display_height)
+            except ValueError as e:
+                replies.append(f"ERR\t{e}")
+                continue
+            replies.append(f"OK\t{len(cart)}\t{format_money(cart.total)}")
+        if screen is None:
+            pipeline.display_welcome()
+            shown = None
+        elif screen:
+            pipeline.display_cart(screen, len(cart))
+            shown = screen
+        if replies:
+            await send({"type": "websocket.send", "text": "\n".join(replies)})
+
+
+ROUTES = {
+    "/api/welcome": ("GET", welcome),
+    "/api/receive_order": ("POST", receive_order),
+    "/api/status": ("GET", status),
+    "/api/broadcast": ("POST", broadcast),
+    "/api/displays": ("GET", list_displays),
+}
+
+WEBSOCKET_ROUTES = {
+    "/api/cart": cart_session,
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            for pipeline in pipelines.values():
+                pipeline.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.gather(*(pipeline.stop() for pipeline in pipelines.values()))
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    for pipeline in pipelines.values():
+        pipeline.start()  # servers without lifespan support
+    if scope["type"] == "websocket":
+        await websocket(scope, receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    route = ROUTES.get(scope["path"])
+    if route is None:
+        await send_json(send, 404, {"error": "Not found"})
+        return
+    method, handler = route
+    if scope["method"] == "OPTIONS":
+        await send({"type": "http.response.start", "status": 204, "headers": CORS_HEADERS})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    if scope["method"] != method:
+        await send_json(send, 405, {"error": "Method not allowed"})
+        return
+    pipeline = select_pipeline(scope)
+    if pipeline is None:
+        await send_json(send, 404, {"status": "error", "message": "Unknown display", "displays": list(pipelines)})
+        return
+    try:
+        await handler(scope, receive, send, pipeline)
+    except Exception as e:
+        logger.error(f"Error in {scope['path']} endpoint: {e}")
+        await send_json(send, 500, {"status": "error", "message": "Internal server error"})
+
+
+async def websocket(scope, receive, send):
+    handler = WEBSOCKET_ROUTES.get(scope["path"])
+    pipeline = select_pipeline(scope)
+    if handler is None or pipeline is None:
+        await send({"type": "websocket.close", "code": 4404})  # refused before accept
+        return
+    try:
+        await handler(scope, receive, send, pipeline)
+    except Exception as e:
+        logger.error(f"Error in {scope['path']} session: {e}")
+        await send({"type": "websocket.close", "code": 1011})
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("ASGI mode needs an ASGI server, e.g. pip install uvicorn")
+    uvicorn.run(app, host='127.0.0.1', port=SERVER_PORT, access_log=False)
@@ -0,0 +1,181 @@
+"""Benchmark the VFD220 render and serial write paths.
+
+Runs every scenario against the VFD220 emulator at each baud rate of
+VFD_BAUD_RATES and reports frames/second, bytes/frame, writes/frame and
+per-frame latency. Results are printed as a table and saved as JSON.
+
+    python benchmark.py --frames 200 --output benchmark_results.json
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+# Keep the benchmark off the real serial port, and leave the
+# last known-good connection cache of the real display alone
+os.environ['VFD_EMULATOR'] = 'True'
+os.environ['VFD_CACHE_PATH'] = ''
+
+from vfd220 import VFD220, VFD220Group
+from vfd_emulator import VFD220Emulator
+
+GROUP_SIZE = 4  # displays in the broadcast scenario
+
+
+def order_lines(i):
+    """Two-line order frame whose prices change every frame"""
+    return [f"COCA   : {(i % 50) * 500:,} Ar".replace(',', ' '),
+            f"TOTAL = {12000 + (i % 50) * 500:,} Ar".replace(',', ' ')]
+
+
+def order_items(i):
+    """Order payload as posted to /api/receive_order"""
+    date = datetime.fromtimestamp(1700000000 + i, tz=timezone.utc).isoformat()
+    return [
+        {"name": "PAIN", "price": "500", "quantity": 2, "date": date},
+        {"name": "COCA", "price": "2500", "quantity": (i % 9) + 1, "date": date},
+    ]
+
+
+def make_vfd(baud, model_timing):
+    """VFD220 connected to an emulated display at a single baud rate"""
+    transport = functools.partial(VFD220Emulator, model_timing=model_timing)
+    vfd = VFD220(port='EMU', baud_rates=[baud], serial_class=transport)
+    vfd.connect()
+    return vfd
+
+
+def measure(calls, render):
+    """Time render(i) for each call; returns the per-call latencies"""
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        render(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(name, baud, vfd, latencies, rendered, bytes_before, writes_before):
+    """Aggregate one scenario; latencies are per call, rates per rendered frame"""
+    total_time = sum(latencies)
+    sent = vfd.ser.bytes_written - bytes_before
+    writes = vfd.ser.write_count - writes_before
+    ordered = sorted(latencies)
+    return {
+        "scenario": name,
+        "baud_rate": baud,
+        "calls": len(latencies),
+        "frames": rendered,
+        "frames_per_second": rendered / total_time if total_time else None,
+        "bytes_per_frame": sent / rendered,
+        "writes_per_frame": writes / rendered,
+        "latency_ms": {
+            "mean": statistics.mean(latencies) * 1000,
+            "p50": ordered[len(ordered) // 2] * 1000,
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            "max": ordered[-1] * 1000,
+        },
+    }
+
+
+def scroll_frames(vfd, message):
+    """Number of frames scroll_text renders for message"""
+    longest = max(len(line) for line in message.split('\n'))
+    return longest + vfd.display_width + 1
+
+
+def run_scenarios(baud, frames, model_timing):
+    """Run every scenario at one baud rate"""
+    from vfd_manager import VFDManager
+
+    vfd = make_vfd(baud, model_timing)
+    scroll_message = "Bienvenue chez ILO MARKET\nPromo: 2 achetes = 1 offert"
+    scroll_runs = max(1, frames // scroll_frames(vfd, scroll_message))
+
+    # (name, calls, frames per call, render)
+    scenarios = [
+        ("send_multiline_text", frames, 1, lambda i: vfd.send_multiline_text(order_lines(i))),
+        ("center_text", frames, 1, lambda i: vfd.center_text('\n'.join(order_lines(i)))),
+        ("display_static_text", frames, 1, lambda i: vfd.display_static_text('\n'.join(order_lines(i)))),
+        ("scroll_text", scroll_runs, scroll_frames(vfd, scroll_message),
+         lambda i: vfd.scroll_text(scroll_message, scroll_speed=0)),
+    ]
+
+    results = []
+    for name, calls, frames_per_call, render in scenarios:
+        vfd.clear_display()
+        bytes_before, writes_before = vfd.ser.bytes_written, vfd.ser.write_count
+        latencies = measure(calls, render)
+        results.append(summarize(name, baud, vfd, latencies, calls * frames_per_call,
+                                 bytes_before, writes_before))
+
+    # Same frames on a group of displays, written concurrently
+    group = VFD220Group([vfd] + [make_vfd(baud, model_timing) for _ in range(GROUP_SIZE - 1)])
+    group.clear_display()
+    bytes_before, writes_before = vfd.ser.bytes_written, vfd.ser.write_count
+    latencies = measure(frames, lambda i: group.send_multiline_text(order_lines(i)))
+    results.append(summarize(f"VFD220Group x{GROUP_SIZE}", baud, vfd, latencies, frames,
+                             bytes_before, writes_before))
+    for member in group.displays[1:]:
+        member.disconnect()
+
+    # End-to-end through the VFDManager writer thread
+    manager = VFDManager(vfd)
+    manager.wait_idle()
+    vfd.clear_display()
+    bytes_before, writes_before = vfd.ser.bytes_written, vfd.ser.write_count
+
+    def display_order(i):
+        manager.display_order(order_items(i))
+        manager.wait_idle()
+
+    latencies = measure(frames, display_order)
+    results.append(summarize("VFDManager.display_order", baud, vfd, latencies, frames,
+                             bytes_before, writes_before))
+    manager.deconnect()
+    return results
+
+
+def print_table(results):
+    print(f"{'scenario':<26}{'baud':>7}{'fps':>10}{'B/frame':>9}{'wr/frame':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for r in results:
+        fps = r['frames_per_second'] or 0
+        print(f"{r['scenario']:<26}{r['baud_rate']:>7}{fps:>10.1f}{r['bytes_per_frame']:>9.1f}"
+              f"{r['writes_per_frame']:>9.2f}{r['latency_ms']['p50']:>9.3f}{r['latency_ms']['p95']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the VFD220 render and write paths")
+    parser.add_argument('--frames', type=int, default=200, help="frames per scenario")
+    parser.add_argument('--baud-rates', default=os.getenv('VFD_BAUD_RATES', '9600,2400,4800,19200'),
+                        help="comma-separated baud rates (default: VFD_BAUD_RATES)")
+    parser.add_argument('--no-timing', action='store_true',
+                        help="do not model serial byte time (measures host CPU cost only)")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON results file")
+    args = parser.parse_args()
+
+    baud_rates = [int(rate.strip()) for rate in args.baud_rates.split(',')]
+    results = []
+    for baud in baud_rates:
+        results.extend(run_scenarios(baud, args.frames, not args.no_timing))
+
+    print_table(results)
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "model_timing": not args.no_timing,
+        "frames": args.frames,
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Server-side cart of a POS session, mutated by streamed commands.
+
+A POS terminal keeps one session open and sends a command per scan instead
+of re-posting the whole order. Commands are tab-separated lines, like the
+order lines of vfd_ingest.py:
+
+    add\t<sku>\t<name>\t<price>[\t<quantity>]   add to a line (created if new)
+    remove\t<sku>                              drop a line
+    qty\t<sku>\t<quantity>                     set a line's quantity (0 drops it)
+    clear                                      empty the cart (next customer)
+"""
+from typing import Dict, List, Optional
+from order_display import format_item_line, format_total_line
+
+
+class Cart:
+    """Cart lines by SKU, in the order they were first scanned.
+
+    Every change adjusts the running total by the line's delta and formats
+    only that line, so a scan costs the same for a 3-line or a 500-line cart.
+    """
+
+    def __init__(self):
+        self.items: Dict[str, Dict[str, object]] = {}
+        self.total = 0.0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _set(self, sku: str, name: str, price: float, quantity: int) -> Optional[str]:
+        """Replace one line (quantity <= 0 drops it); return its display line"""
+        item = self.items.get(sku)
+        if item is not None:
+            self.total -= item["total"]
+        if quantity <= 0:
+            if item is not None:
+                del self.items[sku]
+            if not self.items:
+                self.total = 0.0  # no float residue on an empty cart
+            return None
+        item_total = price * quantity
+        line = format_item_line(name, item_total)
+        self.items[sku] = {"name": name, "price": price, "quantity": quantity, "total": item_total, "line": line}
+        self.total += item_total
+        return line
+
+    def _item(self, sku: str) -> Dict[str, object]:
+        item = self.items.get(sku)
+        if item is None:
+            raise ValueError(f"Unknown item: {sku}")
+        return item
+
+    def add(self, sku: str, name: str, price: float, quantity: int = 1) -> Optional[str]:
+        item = self.items.get(sku)
+        return self._set(sku, name, price, quantity + (item["quantity"] if item is not None else 0))
+
+    def remove(self, sku: str) -> Optional[str]:
+        item = self._item(sku)
+        return self._set(sku, item["name"], item["price"], 0)
+
+    def set_quantity(self, sku: str, quantity: int) -> Optional[str]:
+        item = self._item(sku)
+        return self._set(sku, item["name"], item["price"], quantity)
+
+    def clear(self):
+        self.items.clear()
+        self.total = 0.0
+
+    def lines(self) -> List[str]:
+        """Display lines of the whole cart: one per item, then the total"""
+        return [item["line"] for item in self.items.values()] + [format_total_line(self.total)]
+
+    def screen(self, sku: Optional[str] = None, height: int = 2) -> List[str]:
+        """Lines filling a display of height rows after a change to sku.
+
+        The most recently scanned other lines, then the changed line (unless
+        it was dropped), then the total. Only the last few lines are read, so
+        the cost does not grow with the cart.
+        """
+        changed = self.items.get(sku) if sku is not None else None
+        room = max(0, height - 1 - (changed is not None))
+        rows = []
+        for other in reversed(self.items):
+            if len(rows) >= room:
+                break
+            if other != sku:
+                rows.append(self.items[other]["line"])
+        rows.reverse()
+        if changed is not None:
+            rows.append(changed["line"])
+        rows.append(format_total_line(self.total))
+        return rows
+
+    def apply(self, command: str, height: int = 2) -> Optional[List[str]]:
+        """Run one command line; return the lines to show on a display of
+        height rows (None: cart cleared).
+
+        Raises ValueError for a malformed command or an unknown SKU.
+        """
+        fields = command.rstrip('\r\n').split('\t')
+        op, args = fields[0], fields[1:]
+        if op == 'add' and len(args) in (3, 4):
+            self.add(args[0], args[1], float(args[2]), int(args[3]) if len(args) == 4 else 1)
+        elif op == 'remove' and len(args) == 1:
+            self.remove(args[0])
+        elif op == 'qty' and len(args) == 2:
+            self.set_quantity(args[0], int(args[1]))
+        elif op == 'clear' and not args:
+            self.clear()
+            return None
+        else:
+            raise ValueError(f"Invalid command: {command.rstrip()}")
+        return self.screen(args[0], height)
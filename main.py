@@ -1,16 +1,19 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import logging
+import multiprocessing
 import os
-from datetime import datetime, timezone
-import threading
-import time
 from typing import List, Dict, Optional
-from vfd220 import VFD220
+from vfd_registry import DisplayRegistry
+from vfd_client import BrokerClient
+from vfd_framebuffer import SHARED_FRAMEBUFFER, read_screen
+from vfd_ingest import OrderIngest
+from order_display import validate_order_data
 
-WELCOME_MESSAGE = " CAISSE ILO MARKET  Pret a vous servir !"
-VFD_TIMEOUT = 5  # seconds
-DISPLAY_TIMEOUT = 10  # seconds
+SERVER_PORT = int(os.getenv('SERVER_PORT', '8086'))
+FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+# Send display commands to the display broker (vfd_broker.py) instead of owning the ports
+BROKER = os.getenv('VFD_BROKER', 'False').lower() == 'true'
 
 def setup_logger() -> logging.Logger:
     """Configure logger with file and console handlers"""
@@ -39,236 +42,67 @@ def setup_logger() -> logging.Logger:
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
+
+    # The display pipeline modules log through the same handlers
+    for name in ('vfd_manager', 'vfd_process', 'vfd_registry', 'vfd_client', 'vfd_ingest'):
+        pipeline_logger = logging.getLogger(name)
+        pipeline_logger.setLevel(logging.INFO)
+        pipeline_logger.handlers = list(logger.handlers)
     
     return logger
 
 logger = setup_logger()
 
 
-class VFDManager:
-    """Manages a single persistent VFD display connection with thread safety"""
-
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._dates = []
-        self._vfd = VFD220()
-        self._connected = False
-        self._connect()
-
-    def _connect(self):
-        """Establish connection if not already connected"""
-        if not self._connected:
-            try:
-                self._connected = self._vfd.connect()
-                if not self._connected:
-                    logger.error("Failed to connect to VFD display")
-            except PermissionError as e:
-                logger.error(f"PermissionError: Cannot open serial port (maybe already in use or insufficient permissions): {e}")
-                self._connected = False
-            except Exception as e:
-                logger.error(f"Exception during VFD connect: {e}")
-                self._connected = False
-
-    def _ensure_connection(self):
-        """Ensure the VFD is connected before any operation"""
-        if not (self._vfd and self._vfd.is_connected()):
-            self._connected = False
-            self._connect()
-
-    def test_connection(self) -> bool:
-        """Test VFD display connection"""
-        with self._lock:
-            self._ensure_connection()
-            if not self._connected:
-                return False
-            try:
-                self._vfd.clear_display()
-                self._vfd.send_text(WELCOME_MESSAGE)
-                return True
-            except Exception as e:
-                logger.error(f"VFD connection test failed: {e}")
-                self._connected = False
-                return False
-
-    def display_welcome(self) -> bool:
-        """Display welcome message on VFD"""
-        self._dates.clear()
-        with self._lock:
-            self._ensure_connection()
-            if not self._connected:
-                return False
-            try:
-                self._vfd.clear_display()
-                self._vfd.send_text(WELCOME_MESSAGE)
-                return True
-            except Exception as e:
-                logger.error(f"Error displaying welcome message: {e}")
-                self._connected = False
-                return False
-    
-    def exist_date_sup(self,date_verif):
-        for date in self._dates:
-            if date_verif < date:
-                return True
-        return False
-    
-    def display_order(self, order_items: List[Dict[str, str]]) -> bool:
-        """Display order on VFD"""
-        if not order_items:
-            logger.warning("No order items to display")
-            return False
-        if (self.exist_date_sup(VFDManager._to_date(order_items[1]['date']))):
-            logger.warning("Order date is earlier than the last displayed order, skipping display")
-            return False
-        
-        with self._lock:
-            self._ensure_connection()
-            if not self._connected:
-                return False
-            try:
-                self._vfd.clear_display()
-
-                lines = []
-                total = 0
-                
-                self._dates.append(VFDManager._to_date(order_items[1]['date']))
-
-                for item in order_items:
-                    name = str(item.get("name", "Unknown"))
-                    price = float(item.get('price', 0))
-                    quantity = int(item.get('quantity', 1))
-                    item_total = price * quantity
-                    total += item_total
-
-                    formatted_name = self._format_name(name)
-                    formatted_price = self._format_money(item_total)
-                    lines.append(f"{formatted_name}: {formatted_price} Ar")
-
-                # Add total line
-                total_formatted = self._format_money(total)
-                lines.append(f"TOTAL = {total_formatted} Ar")
-
-                self._vfd.send_multiline_text(lines)
-                return True
-
-            except Exception as e:
-                logger.error(f"Error displaying order: {e}")
-                self._connected = False
-                return False
-            
-    def deconnect(self):
-        self._vfd.disconnect()
-        self._connected = False
-
-
-    @staticmethod
-    def _format_money(value: float) -> str:
-        """Format a float value as money with thousands separator"""
-        return f"{value:,.0f}".replace(',', ' ')
-
-    @staticmethod
-    def _format_name(name: str) -> str:
-        """Format name to fit VFD display constraints"""
-        if len(name) >= 7:
-            return name[:7]
-        return name.ljust(5)
-    
-    @staticmethod
-    def _to_date(date_str: str) -> str:
-        """Convert date string to ISO format"""
-        try:
-            dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-            return dt
-        except ValueError:
-            logger.error(f"Invalid date format: {date_str}")
-            return date_str
-
-# Global instances
-current_display_thread: Optional[threading.Thread] = None
-stop_display_event = threading.Event()
-orders: List[Dict[str, str]] = []
-vfd_manager = VFDManager()
+# Global instances. Display worker processes re-import this module when they
+# are spawned; only the server process owns the displays.
+if multiprocessing.current_process().name == 'MainProcess':
+    displays = DisplayRegistry(broker=BrokerClient() if BROKER else None)
+    orders: Dict[str, List[Dict[str, str]]] = {display_id: [] for display_id in displays.ids()}
 
 app = Flask(__name__)
 CORS(app)
 
-def validate_order_data(data: List[Dict]) -> bool:
-    """Validate order data structure"""
-    if not isinstance(data, list):
-        return False
-    
-    for item in data:
-        if not isinstance(item, dict):
-            return False
-        
-        # Check required fields
-        if 'name' not in item or 'price' not in item:
-            return False
-        
-        # Validate data types
-        try:
-            float(item.get('price', 0))
-            int(item.get('quantity', 1))
-        except (ValueError, TypeError):
-            return False
-    
-    return True
-
-def display_order_thread(order: List[Dict[str, str]], stop_event: threading.Event) -> None:
-    """Display order on VFD in a separate thread"""
-    global orders
-    
-    try:
-        # Update global orders
-        orders.clear()
-        orders.extend(order)
-        
-        # Display the order
-        success = vfd_manager.display_order(order)
-        if not success:
-            logger.error("Failed to display order on VFD")
-        
-        # Wait for timeout or stop event
-        stop_event.wait(DISPLAY_TIMEOUT)
-        
-    except Exception as e:
-        logger.error(f"Error in display thread: {e}")
-
-def display_order_on_vfd(order: List[Dict[str, str]]) -> bool:
-    """Start displaying order on VFD in a thread"""
-    global current_display_thread, stop_display_event
-
+def display_order_on_vfd(order: List[Dict[str, str]], display_id: Optional[str] = None) -> bool:
+    """Hand an order to the writer thread of a display"""
     if not validate_order_data(order):
         logger.error("Invalid order data provided")
         return False
 
+    vfd_manager = displays.get(display_id)
+    if vfd_manager is None:
+        logger.error(f"Unknown display: {display_id}")
+        return False
+
     try:
-        if current_display_thread and current_display_thread.is_alive():
-            logger.debug("Stopping previous display thread")
-            stop_display_event.set()
-            current_display_thread.join(timeout=2)
-            stop_display_event.clear()
+        # Update the display's orders
+        orders[vfd_manager.name].clear()
+        orders[vfd_manager.name].extend(order)
 
-        stop_display_event = threading.Event()
-        current_display_thread = threading.Thread(
-            target=display_order_thread,
-            args=(order, stop_display_event),
-            daemon=True,
-            name="VFD-Display-Thread"
-        )
-        current_display_thread.start()
+        # The writer thread renders it and reverts to welcome after DISPLAY_TIMEOUT
+        success = vfd_manager.display_order(order)
+        if not success:
+            logger.error("Failed to display order on VFD")
 
-        logger.debug(f"Started new display thread for {len(order)} items")
+        logger.debug(f"Queued display of {len(order)} items on {vfd_manager.name}")
         return True
 
     except Exception as e:
-        logger.error(f"Error starting display thread: {e}")
+        logger.error(f"Error queuing order display: {e}")
         return False
 
+def unknown_display():
+    """Response for a ?display= ID that is not configured"""
+    return jsonify({"status": "error", "message": f"Unknown display: {request.args.get('display')}",
+                    "displays": displays.ids()}), 404
+
 @app.route('/api/welcome', methods=['GET'])
 def welcome():
-    """API endpoint to display welcome message"""
+    """API endpoint to display welcome message (?display=<id> selects the display)"""
     try:
+        vfd_manager = displays.get(request.args.get('display'))
+        if vfd_manager is None:
+            return unknown_display()
         success = vfd_manager.display_welcome()
         if success:
             return jsonify({"status": "success", "message": "Welcome message displayed"}), 200
@@ -280,8 +114,12 @@ def welcome():
 
 @app.route('/api/receive_order', methods=['POST'])
 def receive_order():
-    """API endpoint to receive and display orders"""
+    """API endpoint to receive and display orders (?display=<id> selects the display)"""
     try:
+        display_id = request.args.get('display')
+        if displays.get(display_id) is None:
+            return unknown_display()
+
         data = request.get_json()
         
         if not data:
@@ -293,7 +131,7 @@ def receive_order():
         logger.debug(f"Received order: {len(data)} items")
         
         # Display order on VFD
-        success = display_order_on_vfd(data)
+        success = display_order_on_vfd(data, display_id)
         
         if success:
             return jsonify({"status": "success", "message": "Order displayed"}), 200
@@ -306,38 +144,90 @@ def receive_order():
 
 @app.route('/api/status', methods=['GET'])
 def status():
-    """API endpoint to check VFD status"""
+    """API endpoint to check VFD status (no display I/O, ?display=<id> selects the display)"""
     try:
-        is_connected = vfd_manager.test_connection()
+        vfd_manager = displays.get(request.args.get('display'))
+        if vfd_manager is None:
+            return unknown_display()
+        health = vfd_manager.health()
+        is_connected = bool(health["connected"])
         response = {
             "status": "success" if is_connected else "error",
+            "display": vfd_manager.name,
             "vfd_connected": is_connected,
-            "current_orders": len(orders)
+            "current_orders": len(orders[vfd_manager.name]),
+            "vfd": health
         }
+        if SHARED_FRAMEBUFFER:
+            response["screen"] = read_screen(vfd_manager.name)
         if not is_connected:
             response["message"] = (
                 "VFD not connected. "
                 "Possible reasons: COM port in use, access denied, or hardware not present. "
-                "Check that COM4 is available and not used by another program."
+                f"Check that {vfd_manager.port} is available and not used by another program."
             )
         return jsonify(response), 200 if is_connected else 500
     except Exception as e:
         logger.error(f"Error checking status: {e}")
         return jsonify({"status": "error", "message": "Internal server error"}), 500
 
+@app.route('/api/broadcast', methods=['POST'])
+def broadcast():
+    """API endpoint showing the same lines on a group of displays (default: all)"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get('lines'), list):
+            return jsonify({"error": "Expected {\"lines\": [...], \"displays\": [...]}"}), 400
+
+        display_ids = data.get('displays')
+        unknown = [display_id for display_id in display_ids or [] if displays.get(display_id) is None]
+        if unknown:
+            return jsonify({"status": "error", "message": f"Unknown display: {', '.join(unknown)}",
+                            "displays": displays.ids()}), 404
+
+        queued = displays.broadcast([str(line) for line in data['lines']], display_ids)
+        logger.debug(f"Queued broadcast on {len(queued)} displays")
+        if all(queued.values()):
+            return jsonify({"status": "success", "message": "Broadcast displayed", "displays": queued}), 200
+        return jsonify({"status": "error", "message": "Failed to display broadcast", "displays": queued}), 500
+    except Exception as e:
+        logger.error(f"Error in broadcast endpoint: {e}")
+        return jsonify({"status": "error", "message": "Internal server error"}), 500
+
+@app.route('/api/displays', methods=['GET'])
+def list_displays():
+    """API endpoint listing the configured displays and their health"""
+    try:
+        return jsonify({
+            "default": displays.default_id,
+            "displays": {
+                display_id: {"port": displays.get(display_id).port, "vfd": displays.get(display_id).health()}
+                for display_id in displays.ids()
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f"Error listing displays: {e}")
+        return jsonify({"status": "error", "message": "Internal server error"}), 500
+
 if __name__ == '__main__':
-    logger.info("Testing VFD connection on startup...")
-    if vfd_manager.test_connection():
-        logger.info("VFD test successful - starting Flask server")
-        vfd_manager.deconnect()
-    else:
-        logger.warning("VFD test failed - server will start but display may not work")
+    logger.info("Testing VFD connections on startup...")
+    for display_id, ok in displays.test_connections().items():
+        if ok:
+            logger.info(f"VFD {display_id} test successful")
+        else:
+            logger.warning(f"VFD {display_id} test failed - server will start but this display may not work")
     
+    # Optional Unix socket / UDP order ingestion (VFD_INGEST_SOCKET, VFD_INGEST_UDP_PORT)
+    ingest = OrderIngest(display_order_on_vfd)
+    ingest.start()
+
     try:
-        app.run(port=8086, debug=True)
+        # No reloader: a second process would fight over the serial port
+        app.run(port=SERVER_PORT, debug=FLASK_DEBUG, use_reloader=False)
     except KeyboardInterrupt:
         logger.info("Server shutdown requested")
-        if current_display_thread and current_display_thread.is_alive():
-            stop_display_event.set()
-            current_display_thread.join(timeout=2)
+    finally:
+        # werkzeug handles Ctrl+C itself and app.run() just returns
+        ingest.close()
+        displays.close()
         logger.info("Server stopped")
\ No newline at end of file
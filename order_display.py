@@ -0,0 +1,87 @@
+import logging
+from datetime import datetime
+from typing import List, Dict
+
+WELCOME_MESSAGE = " CAISSE ILO MARKET  Pret a vous servir !"
+DISPLAY_TIMEOUT = 10  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+def validate_order_data(data: List[Dict]) -> bool:
+    """Validate order data structure"""
+    if not isinstance(data, list):
+        return False
+
+    for item in data:
+        if not isinstance(item, dict):
+            return False
+
+        # Check required fields
+        if 'name' not in item or 'price' not in item:
+            return False
+
+        # Validate data types
+        try:
+            float(item.get('price', 0))
+            int(item.get('quantity', 1))
+        except (ValueError, TypeError):
+            return False
+
+    return True
+
+
+def welcome_lines(display_width: int, display_height: int) -> List[str]:
+    """WELCOME_MESSAGE cut into display rows, as it reads when written in one go"""
+    rows = [WELCOME_MESSAGE[i:i + display_width] for i in range(0, len(WELCOME_MESSAGE), display_width)]
+    return rows[:display_height]
+
+
+def build_order_lines(order_items: List[Dict[str, str]]) -> List[str]:
+    """Format order items and the grand total as display lines"""
+    lines = []
+    total = 0
+
+    for item in order_items:
+        name = str(item.get("name", "Unknown"))
+        price = float(item.get('price', 0))
+        quantity = int(item.get('quantity', 1))
+        item_total = price * quantity
+        total += item_total
+        lines.append(format_item_line(name, item_total))
+
+    # Add total line
+    lines.append(format_total_line(total))
+    return lines
+
+
+def format_item_line(name: str, item_total: float) -> str:
+    """Display line of one order item"""
+    return f"{format_name(name)}: {format_money(item_total)} Ar"
+
+
+def format_total_line(total: float) -> str:
+    """Display line of the grand total"""
+    return f"TOTAL = {format_money(total)} Ar"
+
+
+def format_money(value: float) -> str:
+    """Format a float value as money with thousands separator"""
+    return f"{value:,.0f}".replace(',', ' ')
+
+
+def format_name(name: str) -> str:
+    """Format name to fit VFD display constraints"""
+    if len(name) >= 7:
+        return name[:7]
+    return name.ljust(5)
+
+
+def to_date(date_str: str) -> str:
+    """Convert date string to ISO format"""
+    try:
+        dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+        return dt
+    except ValueError:
+        logger.error(f"Invalid date format: {date_str}")
+        return date_str
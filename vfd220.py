@@ -1,13 +1,67 @@
 import serial
+from serial.tools import list_ports
+import json
 import time
 import logging
 import threading
 import os
+import functools
+import collections
+import contextlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from vfd_emulator import VFD220Emulator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Load environment variables from .env file
 load_dotenv()
 
+# VFD220 command bytes
+CLEAR_COMMAND = b'\x0C'
+CURSOR_COMMAND = b'\x1B\x4C'  # ESC L position
+MARQUEE_COMMAND = b'\x1B\x51\x44'  # ESC Q D text CR: upper line scrolls in firmware
+MARQUEE_MAX_LENGTH = 40
+
+# Scroll modes, part of the compiled scroll cache key
+SCROLL_ONCE = 'once'
+SCROLL_LOOP_ALL = 'loop_all'
+SCROLL_LOOP_LONG = 'loop_long'
+SCROLL_CACHE_SIZE = int(os.getenv('VFD_SCROLL_CACHE_SIZE', '32'))
+
+# Name of the display configured by the global VFD_* settings alone
+DEFAULT_DISPLAY = 'default'
+
+# Serializes read-modify-write of the connection cache shared by all displays
+_cache_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _locked_cache(cache_path):
+    """Hold the connection cache lock, across threads and processes.
+
+    Display worker processes and the broker connect several displays at
+    once; a lock file next to the cache keeps their updates from losing
+    each other's entries.
+    """
+    with _cache_lock, open(cache_path + '.lock', 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file closes
+            yield
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
 def setup_vfd_logger():
     """Configure logger for VFD module using environment variables"""
     logger = logging.getLogger(__name__)
@@ -38,10 +92,71 @@ def setup_vfd_logger():
         
     return logger
 
+def load_display_configs():
+    """Named display configurations, as VFD220 keyword arguments.
+
+    VFD_DISPLAYS lists display IDs (e.g. "lane1,lane2"). Each display reads
+    VFD_<ID>_PORT, VFD_<ID>_BAUD_RATES, VFD_<ID>_WIDTH and VFD_<ID>_HEIGHT
+    (ID upper-cased, '-' as '_'), falling back to the global VFD_* settings.
+    Without VFD_DISPLAYS there is a single DEFAULT_DISPLAY.
+    """
+    display_ids = [name.strip() for name in os.getenv('VFD_DISPLAYS', '').split(',') if name.strip()]
+    if not display_ids:
+        return {DEFAULT_DISPLAY: {}}
+
+    configs = {}
+    for display_id in display_ids:
+        prefix = f"VFD_{display_id.upper().replace('-', '_')}_"
+        config = {}
+        if os.getenv(prefix + 'PORT'):
+            config['port'] = os.getenv(prefix + 'PORT')
+        if os.getenv(prefix + 'BAUD_RATES'):
+            config['baud_rates'] = [int(rate.strip()) for rate in os.getenv(prefix + 'BAUD_RATES').split(',')]
+        if os.getenv(prefix + 'WIDTH'):
+            config['display_width'] = int(os.getenv(prefix + 'WIDTH'))
+        if os.getenv(prefix + 'HEIGHT'):
+            config['display_height'] = int(os.getenv(prefix + 'HEIGHT'))
+        configs[display_id] = config
+    return configs
+
+class FrameScheduler:
+    """Paces frames against absolute deadlines on the monotonic clock.
+
+    Frame k is due at start + k * period, so time spent rendering does not
+    accumulate as drift. When a deadline has already passed, the frames that
+    are late are dropped and the most recent one due is returned instead.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.start = time.monotonic()
+        self.step = 0
+        self.dropped = 0
+
+    def wait_next(self, stop_event: threading.Event=None):
+        """Wait for the next frame deadline and return the frame index due"""
+        self.step += 1
+        if self.period <= 0:
+            return self.step
+        deadline = self.start + self.step * self.period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            if stop_event:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+        else:
+            due = int((time.monotonic() - self.start) / self.period)
+            if due > self.step:
+                self.dropped += due - self.step
+                self.step = due
+        return self.step
+
+
 class VFD220:
     """Class to control VFD220 display"""
     
-    def __init__(self, port=None, baud_rates=None, display_width=None, display_height=None):
+    def __init__(self, port=None, baud_rates=None, display_width=None, display_height=None, serial_class=None):
         # Load configuration from environment variables with fallback to defaults
         self.port = port or os.getenv('VFD_PORT', 'COM4')
         
@@ -55,15 +170,50 @@ class VFD220:
         self.display_height = display_height or int(os.getenv('VFD_HEIGHT', '2'))
         
         self.display_size = (self.display_width, self.display_height)
+
+        # Baud rate detection: a harmless probe and the expected answer (empty = echo)
+        self.probe = bytes.fromhex(os.getenv('VFD_PROBE', '00'))
+        self.probe_response = bytes.fromhex(os.getenv('VFD_PROBE_RESPONSE', '')) or self.probe
+        self.probe_timeout = float(os.getenv('VFD_PROBE_TIMEOUT', '0.05'))
+
+        # Device capabilities that cannot be probed
+        self.hardware_scroll = os.getenv('VFD_HARDWARE_SCROLL', 'False').lower() == 'true'
+
+        # Last known-good (port, baud, device identity), tried before the sweep
+        self.cache_path = os.getenv('VFD_CACHE_PATH', '.vfd220_cache.json')
+
+        # Transport used to open the port: serial.Serial or a drop-in replacement
+        if serial_class is None:
+            if os.getenv('VFD_EMULATOR', 'False').lower() == 'true':
+                serial_class = functools.partial(VFD220Emulator, display_width=self.display_width,
+                                                 display_height=self.display_height)
+            else:
+                serial_class = serial.Serial
+        self.serial_class = serial_class
         self.ser = None
+        # Optional SharedFramebuffer mirroring the shadow copy for other processes
+        self.shared_framebuffer = None
+        # Shadow copy of what is currently on the glass (None = unknown)
+        self._framebuffer = None
+        self._cursor = 0
         self.logger = setup_vfd_logger()
         
         # Log the configuration
-        self.logger.info(f"VFD220 initialized: Port={self.port}, Size={self.display_width}x{self.display_height}")
+        self.logger.info(f"VFD220 initialized: Port={self.port}, Size={self.display_width}x{self.display_height}, Transport={getattr(self.serial_class, 'func', self.serial_class).__name__}")
+
+    @property
+    def _framebuffer(self):
+        return self._shadow
+
+    @_framebuffer.setter
+    def _framebuffer(self, lines):
+        self._shadow = lines
+        if self.shared_framebuffer is not None:
+            self.shared_framebuffer.publish(lines)
 
     def open_serial_port(self, port, baud_rate):
         try:
-            ser = serial.Serial(
+            ser = self.serial_class(
                 port=port,
                 baudrate=baud_rate,
                 parity=serial.PARITY_NONE,
@@ -78,18 +228,137 @@ class VFD220:
             return None
 
     def connect(self):
-        """Try to connect to VFD display"""
+        """Open the port and detect the baud rate.
+
+        The last known-good settings are tried first: if the cached port and
+        device identity match and the cached baud rate does not return noise,
+        it is used straight away. Otherwise the port is opened once and each
+        baud rate is probed by switching the open port's speed, writing a
+        harmless probe and reading the reply with a short timeout. A baud rate
+        whose reply matches is selected. Devices that never answer (write-only
+        displays) fall back to the first baud rate that did not return garbage.
+        """
+        identity = self._port_identity()
+        cached = self._load_last_connection()
+        use_cache = (cached is not None and cached.get('port') == self.port
+                     and cached.get('identity') == identity and cached.get('baud_rate') in self.baud_rates)
+        first_baud = cached['baud_rate'] if use_cache else self.baud_rates[0]
+
+        ser = self.open_serial_port(self.port, first_baud)
+        if not ser:
+            self.logger.error(f"Error: Could not open {self.port}")
+            return False
+
+        selected = None
+        if use_cache and self._probe_baud_rate(ser, first_baud) is not False:
+            selected = first_baud
+            self.logger.info(f"Using last known-good baud rate {selected} for {self.port}")
+        else:
+            selected = self._detect_baud_rate(ser)
+
+        try:
+            ser.baudrate = selected
+        except (serial.SerialException, OSError, ValueError) as e:
+            self.logger.error(f"Error: Could not set {self.port} to {selected} baud: {e}")
+            ser.close()
+            return False
+        self.ser = ser
+        self._framebuffer = None
+        self.logger.info(f"Connected to {self.port} at {selected} baud")
+        if not use_cache or selected != first_baud:
+            self._save_last_connection(selected, identity)
+        return True
+
+    def _detect_baud_rate(self, ser):
+        """Probe every configured baud rate on an open port and pick one"""
+        fallback = None
         for baud in self.baud_rates:
-            self.logger.info(f"Trying baud rate: {baud}")
-            self.ser = self.open_serial_port(self.port, baud)
-            if self.ser:
-                time.sleep(1)
-                return True
-            time.sleep(1)
-        
-        self.logger.error(f"Error: Could not open {self.port} at any baud rate")
-        return False
-    
+            self.logger.info(f"Probing baud rate: {baud}")
+            answer = self._probe_baud_rate(ser, baud)
+            if answer is True:
+                return baud
+            if answer is None and fallback is None:
+                fallback = baud
+
+        selected = fallback if fallback is not None else self.baud_rates[0]
+        self.logger.warning(f"No probe answer from {self.port}, assuming {selected} baud")
+        return selected
+
+    def _port_identity(self):
+        """Identify the device behind the port (USB VID:PID:serial or hwid)"""
+        try:
+            for info in list_ports.comports():
+                if info.device == self.port:
+                    if info.vid is not None:
+                        return f"{info.vid:04x}:{info.pid:04x}:{info.serial_number or ''}"
+                    return info.hwid
+        except Exception as e:
+            self.logger.debug(f"Could not list serial ports: {e}")
+        return None
+
+    def _load_last_connection(self):
+        """Read the cached last known-good connection of this port, if any"""
+        return self._read_connection_cache().get(self.port)
+
+    def _read_connection_cache(self):
+        """Read the connection cache: last known-good settings by port"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable connection cache {self.cache_path}: {e}")
+            return {}
+        if 'port' in cache:  # single-port cache written by older versions
+            return {cache['port']: cache}
+        return cache
+
+    def _save_last_connection(self, baud, identity):
+        """Cache the settings of a successful connection, keeping other ports' entries"""
+        if not self.cache_path:
+            return
+        try:
+            with _locked_cache(self.cache_path):
+                cache = self._read_connection_cache()
+                cache[self.port] = {'port': self.port, 'baud_rate': baud, 'identity': identity}
+                # Readers never see a half-written file: write a copy, then swap it in
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_path)),
+                                                prefix=os.path.basename(self.cache_path), suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(cache, f)
+                    os.replace(tmp_path, self.cache_path)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+        except OSError as e:
+            self.logger.warning(f"Could not write connection cache {self.cache_path}: {e}")
+
+    def _probe_baud_rate(self, ser, baud):
+        """Probe one baud rate on an open port.
+
+        Returns True if the expected reply came back, False if something else
+        (line noise from a wrong rate) came back, and None if the device stayed
+        silent.
+        """
+        timeout = ser.timeout
+        try:
+            ser.baudrate = baud
+            ser.timeout = self.probe_timeout
+            ser.reset_input_buffer()
+            ser.write(self.probe)
+            reply = ser.read(len(self.probe_response))
+        except (serial.SerialException, OSError, ValueError) as e:
+            self.logger.warning(f"Probe at {baud} baud failed: {e}")
+            return False
+        finally:
+            ser.timeout = timeout
+        if not reply:
+            return None
+        self.logger.debug(f"Probe reply at {baud} baud: {reply.hex()}")
+        return reply == self.probe_response
+
     def is_connected(self):
         """Check if the serial port is open and handle disconnection gracefully"""
         try:
@@ -107,6 +376,7 @@ class VFD220:
         if self.ser and self.ser.is_open:
             self.ser.close()
             self.logger.info("Serial port closed")
+        self._framebuffer = None
 
     def send_text(self, message):
         if not self.ser:
@@ -115,8 +385,10 @@ class VFD220:
         try:
             message = message + ' ' * (self.display_width - len(message))
             self.ser.write(message.encode('ascii'))
+            self._track_text(message)
             self.logger.debug(f"Sent: {message}")
         except Exception as e:
+            self._framebuffer = None
             self.logger.error(f"Error sending message: {e}")
 
     def move_cursor(self, row, col):
@@ -127,45 +399,146 @@ class VFD220:
         try:
             # Common VFD cursor positioning commands
             position = row * self.display_width + col
-            cmd = bytes([0x1B, 0x4C, position])  # ESC L position
+            cmd = CURSOR_COMMAND + bytes([position])
             self.ser.write(cmd)
+            self._cursor = position
             self.logger.debug(f"Moved cursor to row {row}, col {col}")
         except Exception as e:
+            self._framebuffer = None
             self.logger.error(f"Error moving cursor: {e}")
 
     def send_multiline_text(self, lines):
-        """Send multiple lines of text to fill the display"""
+        """Send multiple lines of text to fill the display.
+
+        Only the cells that differ from the shadow framebuffer are rewritten,
+        using ESC L to jump over unchanged ones. The screen is only cleared
+        when its current contents are unknown. The whole frame is assembled
+        in memory and handed to the port in a single write.
+        """
         if not self.ser:
             self.logger.error("Serial port not open")
             return
         try:
-            # Ensure we have exactly display_height lines
-            lines = lines[-self.display_height:]
-            display_lines = []
-            for i in range(self.display_height):
-                if i < len(lines):
-                    line = lines[i][:self.display_width]  # Truncate if too long
-                    line = line.ljust(self.display_width)  # Pad if too short
-                    display_lines.append(line)
-                else:
-                    display_lines.append(' ' * self.display_width)  # Empty line
-            self.clear_display()
-            for m in display_lines:
-                self.send_text(m)
-            self.logger.debug(f"Sent multiline text: {display_lines}")
+            display_lines = self._fit_lines(lines, self.display_width, self.display_height)
+            frame, cursor = self._build_frame(display_lines)
+            self._write_frame(display_lines, frame, cursor)
         except Exception as e:
+            self._framebuffer = None
             self.logger.error(f"Error sending multiline text: {e}")
 
+    def send_shared_frame(self, shared):
+        """Show a SharedFrame, reusing bytes already encoded for another display"""
+        if not self.ser:
+            self.logger.error("Serial port not open")
+            return
+        try:
+            display_lines, frame, cursor = shared.encode(self)
+            self._write_frame(display_lines, frame, cursor)
+        except Exception as e:
+            self._framebuffer = None
+            self.logger.error(f"Error sending shared frame: {e}")
+
+    def _write_frame(self, display_lines, frame, cursor):
+        """Write an encoded frame in one call and update the shadow framebuffer"""
+        if frame:
+            self.ser.write(frame)
+        self._framebuffer = display_lines
+        self._cursor = cursor
+        self.logger.debug(f"Sent multiline text ({len(frame)} bytes): {display_lines}")
+
+    def _build_frame(self, display_lines):
+        """Encode the bytes that turn the current screen into display_lines.
+
+        Returns (frame, cursor) where frame is a bytearray holding the clear,
+        cursor moves and text for the whole update, and cursor is the cursor
+        position once the frame has been written.
+        """
+        return self._encode_frame(self._framebuffer, self._cursor, display_lines, self.display_width)
+
+    @staticmethod
+    def _encode_frame(current, cursor, display_lines, display_width):
+        """Encode the update from current to display_lines (pure function).
+
+        current=None means the screen contents are unknown and starts the
+        frame with a clear; cursor=None forces a cursor move before the first
+        run, so the result does not depend on where the cursor was.
+        """
+        frame = bytearray()
+        if current is None:
+            frame += CLEAR_COMMAND
+            current = [' ' * display_width] * len(display_lines)
+            cursor = 0
+        cells = display_width * len(display_lines)
+        for row, col, text in VFD220._changed_runs(current, display_lines):
+            position = row * display_width + col
+            if position != cursor:
+                frame += CURSOR_COMMAND
+                frame.append(position)
+            frame += text.encode('ascii')
+            cursor = (position + len(text)) % cells
+        return frame, cursor
+
+    @staticmethod
+    def _fit_lines(lines, display_width, display_height):
+        """Truncate/pad lines to exactly display_height rows of display_width"""
+        # Keep the last display_height lines
+        lines = lines[-display_height:]
+        display_lines = []
+        for i in range(display_height):
+            if i < len(lines):
+                line = lines[i][:display_width]  # Truncate if too long
+                line = line.ljust(display_width)  # Pad if too short
+                display_lines.append(line)
+            else:
+                display_lines.append(' ' * display_width)  # Empty line
+        return display_lines
+
+    @staticmethod
+    def _changed_runs(old_lines, new_lines, max_gap=3):
+        """Yield (row, col, text) runs of cells that differ between two frames.
+
+        Runs separated by at most max_gap unchanged cells are merged, since
+        rewriting those cells costs no more than an ESC L cursor move (3 bytes).
+        """
+        for row, (old, new) in enumerate(zip(old_lines, new_lines)):
+            start = end = None
+            for col, (a, b) in enumerate(zip(old, new)):
+                if a == b:
+                    continue
+                if start is not None and col - end > max_gap:
+                    yield row, start, new[start:end]
+                    start = None
+                if start is None:
+                    start = col
+                end = col + 1
+            if start is not None:
+                yield row, start, new[start:end]
+
+    def _track_text(self, text):
+        """Mirror text written at the cursor into the shadow framebuffer"""
+        if self._framebuffer is None:
+            return
+        cells = self.display_width * self.display_height
+        rows = [list(line) for line in self._framebuffer]
+        for char in text:
+            row, col = divmod(self._cursor, self.display_width)
+            rows[row][col] = char
+            self._cursor = (self._cursor + 1) % cells
+        self._framebuffer = [''.join(row) for row in rows]
+
     def clear_display(self):
         if not self.ser:
             self.logger.error("Serial port not open")
             return
         try:
             # Try common VFD clear commands
-            for cmd in [b'\x0C']:
+            for cmd in [CLEAR_COMMAND]:
                 self.ser.write(cmd)
                 self.logger.debug(f"Sent clear command: {cmd.hex()}")
+            self._framebuffer = [' ' * self.display_width] * self.display_height
+            self._cursor = 0
         except Exception as e:
+            self._framebuffer = None
             self.logger.error(f"Error clearing display: {e}")
 
     def center_text(self, message):
@@ -195,118 +568,165 @@ class VFD220:
             # Take only as many lines as display can show
             lines = lines[:self.display_height]
             
-            self.clear_display()
             self.send_multiline_text(lines)
             self.logger.debug(f"Displayed static text on {len(lines)} lines")
         except Exception as e:
             self.logger.error(f"Error displaying static text: {e}")
 
-    def scroll_text(self, message, scroll_speed=0.01):
+    def scroll_text(self, message, scroll_speed=0.01, stop_event: threading.Event=None):
         """Scroll text using all available lines of the display"""
         try:
-            lines = message.split('\n')
-            
-            # Ensure we use all display lines
-            while len(lines) < self.display_height:
-                lines.append('')
-            lines = lines[:self.display_height]
-            
-            # Add padding for smooth scrolling
-            padded_lines = []
-            max_length = 0
-            
-            for line in lines:
-                padded_line = ' ' * self.display_width + line + ' ' * self.display_width
-                padded_lines.append(padded_line)
-                max_length = max(max_length, len(padded_line))
-            
-            # Ensure all lines have same length
-            for i in range(len(padded_lines)):
-                if len(padded_lines[i]) < max_length:
-                    padded_lines[i] += ' ' * (max_length - len(padded_lines[i]))
-            
-            # Scroll through all lines simultaneously
-            for i in range(max_length - self.display_width + 1):
-                windows = []
-                for padded_line in padded_lines:
-                    window = padded_line[i:i + self.display_width]
-                    windows.append(window)
-                
-                self.clear_display()
-                self.send_multiline_text(windows)
-                
-                self.logger.debug(f"Scrolling: {windows}")
-                time.sleep(scroll_speed)
-                
+            program = compile_scroll(message, self.display_width, self.display_height, SCROLL_ONCE)
+            self._play_scroll(program, scroll_speed, stop_event=stop_event)
         except Exception as e:
+            self._framebuffer = None
             self.logger.error(f"Error scrolling text on all lines: {e}")
 
-    def scroll_text_boucle(self, message, scroll_speed=0.01, scroll_all_lines=True, stop_event: threading.Event=None):
-        """Scroll text in a loop, optionally using all available lines"""
+    def scroll_text_boucle(self, message, scroll_speed=0.01, scroll_all_lines=True, stop_event: threading.Event=None,
+                           hardware=None):
+        """Scroll text in a loop, optionally using all available lines.
+
+        When the display supports it (hardware=None follows the
+        VFD_HARDWARE_SCROLL capability) and only the upper line needs to
+        scroll, the message is uploaded once and scrolled by the firmware;
+        otherwise the host drives every frame.
+        """
         try:
-            lines = message.split('\n')
-            
-            # Add padding for smooth scrolling
-            padded_lines = []
-            max_length = 0
-            
-            for line in lines:
-                # padded_line = line
-                if scroll_all_lines or len(line) >= self.display_width:
-                    padded_line = ' ' * self.display_width + line + ' ' * self.display_width
-                else:
-                    padded_line = line
-                padded_lines.append(padded_line)
-                max_length = max(max_length, len(padded_line))
-
-            # Scroll through all lines simultaneously in a loop
-            while True:
-                for i in range(max_length - self.display_width + 1):
-                    windows = []
-                    for padded_line in padded_lines:
-                        window = padded_line
-                        if scroll_all_lines or len(padded_line) >= self.display_width:
-                            window = padded_line[i:i + self.display_width]
-                        windows.append(window)
-                    
-                    self.clear_display()
-                    self.send_multiline_text(windows)
-                    if stop_event and stop_event.is_set():
-                        self.logger.info("Scrolling stopped by event")
-                        return
-                    self.logger.debug(f"Scrolling: {windows}")
-                    time.sleep(scroll_speed)
-                    
+            if hardware is None:
+                hardware = self.hardware_scroll
+            if hardware and self._hardware_scroll(message, scroll_all_lines):
+                if stop_event is None:
+                    stop_event = threading.Event()  # scroll forever, like the host loop
+                stop_event.wait()
+                self.logger.info("Scrolling stopped by event")
+                self.clear_display()  # also ends the firmware marquee
+                return
+            mode = SCROLL_LOOP_ALL if scroll_all_lines else SCROLL_LOOP_LONG
+            program = compile_scroll(message, self.display_width, self.display_height, mode)
+            self._play_scroll(program, scroll_speed, loop=True, stop_event=stop_event)
         except Exception as e:
+            self._framebuffer = None
             self.logger.error(f"Error scrolling text in loop: {e}")
 
-    def send_beep(self, duration=0.1):
+    def _hardware_scroll(self, message, scroll_all_lines=True):
+        """Start the firmware marquee for message if it fits its constraints.
+
+        The marquee (ESC Q D) scrolls the upper line only, so this applies when
+        the first line is the only one that scrolls and is at most
+        MARQUEE_MAX_LENGTH characters. Returns False to fall back to host
+        scrolling.
+        """
+        if not self.ser:
+            self.logger.error("Serial port not open")
+            return False
+        lines = message.split('\n')[:self.display_height]
+        marquee, static_lines = lines[0], lines[1:]
+        if len(message.split('\n')) > self.display_height or len(marquee) > MARQUEE_MAX_LENGTH:
+            return False
+        if not scroll_all_lines and len(marquee) < self.display_width:
+            return False
+        if any(scroll_all_lines or len(line) >= self.display_width for line in static_lines):
+            return False
+        try:
+            frame = bytearray(CLEAR_COMMAND)
+            for row, line in enumerate(static_lines, start=1):
+                if line:
+                    frame += CURSOR_COMMAND
+                    frame.append(row * self.display_width)
+                    frame += line.encode('ascii')
+            frame += MARQUEE_COMMAND + marquee.encode('ascii') + b'\r'
+            self.ser.write(frame)
+            # The firmware owns the upper line now; force a full redraw next time
+            self._framebuffer = None
+            self.logger.info(f"Hardware scrolling started: {marquee}")
+            return True
+        except Exception as e:
+            self._framebuffer = None
+            self.logger.error(f"Error starting hardware scrolling: {e}")
+            return False
+
+    def _play_scroll(self, program, scroll_speed, loop=False, stop_event=None):
+        """Replay a compiled scroll program on a drift-free schedule.
+
+        Step k is due at start + k * scroll_speed on the monotonic clock, so
+        serial and logging time do not add up. When the host falls behind,
+        late steps are dropped and the next one is drawn with a regular diff
+        render, which merges the skipped deltas. A step whose predecessor is
+        on screen is drawn by writing its precomputed delta.
+        """
+        if not self.ser:
+            self.logger.error("Serial port not open")
+            return
+        count = len(program.frames)
+        scheduler = FrameScheduler(scroll_speed)
+        previous = None
+        step = 0
+        while True:
+            if stop_event and stop_event.is_set():
+                self.logger.info("Scrolling stopped by event")
+                return
+            if not loop and step >= count:
+                if previous != count - 1:
+                    # Dropped the tail: make sure the scroll ends on its last frame
+                    self.send_multiline_text(list(program.frames[-1]))
+                break
+            index = step % count
+            frame = program.frames[index]
+            if previous == (index - 1) % count and self._framebuffer == list(program.frames[previous]):
+                delta = program.deltas[index]
+                if delta:
+                    self.ser.write(delta)
+                self._framebuffer = list(frame)
+                if program.cursors[index] is not None:
+                    self._cursor = program.cursors[index]
+            else:
+                self.send_multiline_text(list(frame))
+            previous = index
+            self.logger.debug("Scrolling: %s", frame)
+            step = scheduler.wait_next(stop_event)
+        if scheduler.dropped:
+            self.logger.debug(f"Scroll dropped {scheduler.dropped} late frames")
+
+    def _pause(self, delay, stop_event: threading.Event=None):
+        """Sleep for delay seconds; returns True as soon as stop_event is set"""
+        if stop_event:
+            return stop_event.wait(delay)
+        time.sleep(delay)
+        return False
+
+    def send_beep(self, duration=0.1, stop_event: threading.Event=None):
         """Send a beep command to the VFD display"""
         if not self.ser:
             self.logger.error("Serial port not open")
             return
+        if stop_event and stop_event.is_set():
+            return
         try:
             # Common VFD beep commands
             for cmd in [b'\x07', b'\x1B\x42']:  # BEL character or ESC B
                 self.ser.write(cmd)
                 self.logger.debug(f"Sent beep command: {cmd.hex()}")
-            time.sleep(duration)
+            self._pause(duration, stop_event)
         except Exception as e:
             self.logger.error(f"Error sending beep: {e}")
 
-    def play_melody(self, melody_pattern, note_duration=0.2):
+    def play_melody(self, melody_pattern, note_duration=0.2, stop_event: threading.Event=None):
         """Play a simple melody using beep sequences"""
         try:
             self.logger.info("Playing melody...")
             for beep_count, pause_duration in melody_pattern:
                 for _ in range(beep_count):
-                    self.send_beep(note_duration)
-                    time.sleep(0.1)
-                time.sleep(pause_duration)
+                    self.send_beep(note_duration, stop_event)
+                    if self._pause(0.1, stop_event):
+                        self.logger.info("Melody stopped by event")
+                        return
+                if self._pause(pause_duration, stop_event):
+                    self.logger.info("Melody stopped by event")
+                    return
         except Exception as e:
             self.logger.error(f"Error playing melody: {e}")
 
-    def play_startup_song(self):
+    def play_startup_song(self, stop_event: threading.Event=None):
         """Play a simple startup melody"""
         startup_melody = [
             (1, 0.2),  # Single beep
@@ -314,16 +734,142 @@ class VFD220:
             (3, 0.5),  # Triple beep
             (1, 0.2),  # Final beep
         ]
-        self.play_melody(startup_melody, note_duration=0.15)
+        self.play_melody(startup_melody, note_duration=0.15, stop_event=stop_event)
 
-    def play_notification_song(self):
+    def play_notification_song(self, stop_event: threading.Event=None):
         """Play a notification melody"""
         notification_melody = [
             (2, 0.1),  # Quick double beep
             (1, 0.2),  # Single beep
             (2, 0.3),  # Double beep with longer pause
         ]
-        self.play_melody(notification_melody, note_duration=0.1)
+        self.play_melody(notification_melody, note_duration=0.1, stop_event=stop_event)
+
+ScrollProgram = collections.namedtuple('ScrollProgram', ['frames', 'deltas', 'cursors'])
+
+
+class SharedFrame:
+    """One frame for many displays, encoded once per distinct starting screen.
+
+    Displays of the same geometry showing the same thing (typically the
+    previous broadcast) get the identical encoded bytes; a display whose
+    screen differs or is unknown gets its own diff, encoded once for every
+    display in that state. Safe to use from several threads.
+    """
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Picklable for display worker processes; the lock stays behind
+        return {'lines': self.lines, '_frames': dict(self._frames)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def encode(self, vfd):
+        """Return (display_lines, frame, cursor) for vfd's current screen"""
+        display_lines = VFD220._fit_lines(self.lines, vfd.display_width, vfd.display_height)
+        current = tuple(vfd._framebuffer) if vfd._framebuffer is not None else None
+        key = (vfd.display_width, vfd.display_height, current, vfd._cursor)
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is None:
+                frame, cursor = vfd._build_frame(display_lines)
+                cached = self._frames[key] = (bytes(frame), cursor)
+        return (display_lines,) + cached
+
+    @property
+    def encodings(self):
+        """Number of distinct frames encoded so far"""
+        return len(self._frames)
+
+
+class VFD220Group:
+    """Several VFD220s driven as one, for content shown on every display.
+
+    Each frame is encoded once as a SharedFrame and written to all ports
+    concurrently, so a broadcast takes about as long as the slowest single
+    display instead of the sum of all of them.
+    """
+
+    def __init__(self, displays):
+        self.displays = list(displays)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.displays)), thread_name_prefix="VFD-Broadcast")
+
+    def _each(self, method, *args):
+        """Call method(vfd, *args) on every display in parallel; returns the results"""
+        return list(self._pool.map(lambda vfd: method(vfd, *args), self.displays))
+
+    def connect(self):
+        """Connect every display; True if all of them connected"""
+        return all(self._each(VFD220.connect))
+
+    def disconnect(self):
+        self._each(VFD220.disconnect)
+
+    def close(self):
+        """Disconnect every display and stop the writer threads"""
+        self.disconnect()
+        self._pool.shutdown()
+
+    def send_multiline_text(self, lines):
+        """Show the same lines on every display"""
+        self._each(VFD220.send_shared_frame, SharedFrame(lines))
+
+    def clear_display(self):
+        self._each(VFD220.clear_display)
+
+
+def _scroll_windows(message, display_width, display_height, mode):
+    """Yield the lines shown at each scroll step"""
+    lines = message.split('\n')
+    if mode == SCROLL_ONCE:
+        # Ensure we use all display lines
+        while len(lines) < display_height:
+            lines.append('')
+        lines = lines[:display_height]
+
+    # Add padding for smooth scrolling
+    padded_lines = []
+    scrolling = []
+    for line in lines:
+        scrolls = mode != SCROLL_LOOP_LONG or len(line) >= display_width
+        padded_lines.append(' ' * display_width + line + ' ' * display_width if scrolls else line)
+        scrolling.append(scrolls)
+    max_length = max(len(line) for line in padded_lines)
+    if mode == SCROLL_ONCE:
+        # Ensure all lines have same length
+        padded_lines = [line.ljust(max_length) for line in padded_lines]
+
+    for i in range(max(1, max_length - display_width + 1)):
+        yield [line[i:i + display_width] if scrolls else line
+               for line, scrolls in zip(padded_lines, scrolling)]
+
+
+@functools.lru_cache(maxsize=SCROLL_CACHE_SIZE)
+def compile_scroll(message, display_width, display_height, mode):
+    """Compile a scrolling message into per-step frames and encoded deltas.
+
+    deltas[i] turns frames[i - 1] into frames[i] (deltas[0] wraps around from
+    the last frame, for looping) and leaves the cursor at cursors[i] (None
+    when the step changes no cell, so the cursor stays put). Results are
+    cached per (message, width, height, mode), so a looping marquee is only
+    encoded once.
+    """
+    frames = tuple(tuple(VFD220._fit_lines(windows, display_width, display_height))
+                   for windows in _scroll_windows(message, display_width, display_height, mode))
+    deltas = []
+    cursors = []
+    for i, frame in enumerate(frames):
+        delta, cursor = VFD220._encode_frame(frames[i - 1], None, frame, display_width)
+        deltas.append(bytes(delta))
+        cursors.append(cursor)
+    return ScrollProgram(frames, tuple(deltas), tuple(cursors))
+
 
 if __name__ == "__main__":
     vfd = VFD220(port='COM4')
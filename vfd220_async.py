@@ -0,0 +1,243 @@
+import asyncio
+import os
+from vfd220 import (VFD220, CLEAR_COMMAND, SCROLL_ONCE, SCROLL_LOOP_ALL, SCROLL_LOOP_LONG,
+                    compile_scroll)
+
+
+class AsyncVFD220:
+    """asyncio driver for the VFD220, built on the same command set as VFD220.
+
+    Connection, configuration, frame encoding and the shadow framebuffer are
+    shared with a wrapped VFD220; only the I/O differs. Frames are written
+    straight to the port's file descriptor in non-blocking mode, waiting for
+    writability with loop.add_writer when the OS buffer is full, and timed
+    effects wait with asyncio instead of time.sleep. Transports without a file
+    descriptor (Windows ports, the emulator) are written from the default
+    executor instead.
+    """
+
+    def __init__(self, port=None, baud_rates=None, display_width=None, display_height=None, serial_class=None):
+        self.vfd = VFD220(port, baud_rates, display_width, display_height, serial_class)
+        self.display_width = self.vfd.display_width
+        self.display_height = self.vfd.display_height
+        self.logger = self.vfd.logger
+        self._fd = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        """Open the port (probing runs in the executor) and switch it to non-blocking"""
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.vfd.connect):
+            return False
+        self._fd = None
+        try:
+            self.vfd.ser.nonblocking()
+            self._fd = self.vfd.ser.fileno()
+        except (AttributeError, NotImplementedError, OSError):
+            self.logger.debug("Port has no pollable file descriptor, writing from the executor")
+        return True
+
+    def is_connected(self):
+        return self.vfd.is_connected()
+
+    async def disconnect(self):
+        async with self._lock:
+            self.vfd.disconnect()
+            self._fd = None
+
+    async def _write(self, data):
+        """Write all of data without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        if self._fd is None:
+            await loop.run_in_executor(None, self.vfd.ser.write, bytes(data))
+            return
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self._fd, view)
+                view = view[written:]
+            except BlockingIOError:
+                await self._writable(loop)
+
+    async def _writable(self, loop):
+        """Wait until the port can take more bytes"""
+        ready = loop.create_future()
+        loop.add_writer(self._fd, ready.set_result, None)
+        try:
+            await ready
+        finally:
+            loop.remove_writer(self._fd)
+
+    async def send_multiline_text(self, lines):
+        """Send multiple lines of text, rewriting only changed cells, in one write"""
+        if not self.vfd.ser:
+            self.logger.error("Serial port not open")
+            return
+        async with self._lock:
+            try:
+                display_lines = self.vfd._fit_lines(lines, self.display_width, self.display_height)
+                frame, cursor = self.vfd._build_frame(display_lines)
+                if frame:
+                    await self._write(frame)
+                self.vfd._framebuffer = display_lines
+                self.vfd._cursor = cursor
+            except Exception as e:
+                self.vfd._framebuffer = None
+                self.logger.error(f"Error sending multiline text: {e}")
+            except BaseException:
+                # Cancelled mid-write: what reached the display is unknown
+                self.vfd._framebuffer = None
+                raise
+
+    async def send_shared_frame(self, shared):
+        """Show a SharedFrame, reusing bytes already encoded for another display"""
+        if not self.vfd.ser:
+            self.logger.error("Serial port not open")
+            return
+        async with self._lock:
+            try:
+                display_lines, frame, cursor = shared.encode(self.vfd)
+                if frame:
+                    await self._write(frame)
+                self.vfd._framebuffer = display_lines
+                self.vfd._cursor = cursor
+            except Exception as e:
+                self.vfd._framebuffer = None
+                self.logger.error(f"Error sending shared frame: {e}")
+            except BaseException:
+                self.vfd._framebuffer = None
+                raise
+
+    async def send_text(self, message):
+        """Write one line of text at the cursor"""
+        if not self.vfd.ser:
+            self.logger.error("Serial port not open")
+            return
+        async with self._lock:
+            try:
+                message = message + ' ' * (self.display_width - len(message))
+                await self._write(message.encode('ascii'))
+                self.vfd._track_text(message)
+            except Exception as e:
+                self.vfd._framebuffer = None
+                self.logger.error(f"Error sending message: {e}")
+            except BaseException:
+                self.vfd._framebuffer = None
+                raise
+
+    async def clear_display(self):
+        if not self.vfd.ser:
+            self.logger.error("Serial port not open")
+            return
+        async with self._lock:
+            try:
+                await self._write(CLEAR_COMMAND)
+                self.vfd._framebuffer = [' ' * self.display_width] * self.display_height
+                self.vfd._cursor = 0
+            except Exception as e:
+                self.vfd._framebuffer = None
+                self.logger.error(f"Error clearing display: {e}")
+            except BaseException:
+                self.vfd._framebuffer = None
+                raise
+
+    async def center_text(self, message):
+        lines = []
+        for line in message.split('\n'):
+            padding = (self.display_width - len(line)) // 2
+            lines.append((' ' * padding + line + ' ' * padding)[:self.display_width])
+        await self.send_multiline_text(lines)
+
+    async def display_static_text(self, message):
+        """Display static text across all available lines"""
+        lines = message.split('\n')
+        while len(lines) < self.display_height:
+            lines.append('')
+        await self.send_multiline_text(lines[:self.display_height])
+
+    async def _pause(self, delay, stop_event: asyncio.Event=None):
+        """Sleep for delay seconds; returns True as soon as stop_event is set"""
+        if stop_event is None:
+            await asyncio.sleep(delay)
+            return False
+        try:
+            await asyncio.wait_for(stop_event.wait(), delay)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def scroll(self, message, scroll_speed=0.01, loop=False, scroll_all_lines=True,
+                     stop_event: asyncio.Event=None):
+        """Scroll text once (or forever with loop=True) from the compiled scroll cache.
+
+        Steps are paced against absolute deadlines on the event loop clock;
+        late steps are dropped and the next one is drawn as a merged diff.
+        """
+        if not self.vfd.ser:
+            self.logger.error("Serial port not open")
+            return
+        mode = SCROLL_ONCE if not loop else (SCROLL_LOOP_ALL if scroll_all_lines else SCROLL_LOOP_LONG)
+        program = compile_scroll(message, self.display_width, self.display_height, mode)
+        count = len(program.frames)
+        clock = asyncio.get_running_loop()
+        start = clock.time()
+        previous = None
+        step = 0
+        try:
+            while not (stop_event and stop_event.is_set()):
+                if not loop and step >= count:
+                    if previous != count - 1:
+                        await self.send_multiline_text(list(program.frames[-1]))
+                    return
+                index = step % count
+                frame = program.frames[index]
+                if previous == (index - 1) % count and self.vfd._framebuffer == list(program.frames[previous]):
+                    async with self._lock:
+                        if program.deltas[index]:
+                            try:
+                                await self._write(program.deltas[index])
+                            except BaseException:
+                                self.vfd._framebuffer = None
+                                raise
+                        self.vfd._framebuffer = list(frame)
+                        if program.cursors[index] is not None:
+                            self.vfd._cursor = program.cursors[index]
+                else:
+                    await self.send_multiline_text(list(frame))
+                previous = index
+
+                step += 1
+                delay = start + step * scroll_speed - clock.time()
+                if delay > 0:
+                    await self._pause(delay, stop_event)
+                elif scroll_speed > 0:
+                    step = max(step, int((clock.time() - start) / scroll_speed))
+            self.logger.info("Scrolling stopped by event")
+        except Exception as e:
+            self.vfd._framebuffer = None
+            self.logger.error(f"Error scrolling text: {e}")
+
+    async def beep(self, duration=0.1, stop_event: asyncio.Event=None):
+        """Send a beep command to the VFD display"""
+        if not self.vfd.ser:
+            self.logger.error("Serial port not open")
+            return
+        if stop_event and stop_event.is_set():
+            return
+        async with self._lock:
+            try:
+                await self._write(b'\x07\x1B\x42')  # BEL character and ESC B
+            except Exception as e:
+                self.logger.error(f"Error sending beep: {e}")
+                return
+        await self._pause(duration, stop_event)
+
+    async def play_melody(self, melody_pattern, note_duration=0.2, stop_event: asyncio.Event=None):
+        """Play a simple melody using beep sequences"""
+        for beep_count, pause_duration in melody_pattern:
+            for _ in range(beep_count):
+                await self.beep(note_duration, stop_event)
+                if await self._pause(0.1, stop_event):
+                    return
+            if await self._pause(pause_duration, stop_event):
+                return
@@ -0,0 +1,134 @@
+"""Display broker: the one process owning the VFD220 serial ports.
+
+Several WSGI workers each importing main.py would all open the same port.
+Instead, run the broker once per machine and start the servers with
+VFD_BROKER=True: their display commands then go to the broker over a Unix
+domain socket (see vfd_client.py), which any POS process can use as well.
+
+    python vfd_broker.py
+
+Protocol: one JSON object per line each way on a persistent connection.
+Request {"id", "method", "display", "args"}, reply {"id", "result"} or
+{"id", "error"}. Unix domain sockets need a POSIX system (or Windows 10+).
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+from typing import Dict
+from vfd_client import BROKER_SOCKET
+from vfd_registry import DisplayRegistry
+from order_display import validate_order_data
+
+# Methods a client may call on a display
+DISPLAY_METHODS = ('display_welcome', 'display_order', 'health', 'wait_idle', 'test_connection', 'deconnect')
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerHandler(socketserver.StreamRequestHandler):
+    """One client connection: serve its requests in order until it closes"""
+
+    def handle(self):
+        for line in self.rfile:
+            request = None
+            try:
+                request = json.loads(line)
+                reply = {"id": request.get("id"), "result": self.server.dispatch(request)}
+            except Exception as e:
+                logger.error(f"Error in VFD broker request: {e}")
+                reply = {"id": request.get("id") if isinstance(request, dict) else None, "error": str(e)}
+            try:
+                self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            except OSError:
+                return
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server dispatching requests to a DisplayRegistry"""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, displays: DisplayRegistry):
+        self.displays = displays
+        super().__init__(path, BrokerHandler)
+
+    def dispatch(self, request: Dict):
+        method = request.get("method")
+        args = request.get("args") or []
+        if method == 'displays':
+            return {display_id: self.displays.get(display_id).port for display_id in self.displays.ids()}
+        if method == 'broadcast':
+            lines, display_ids = args
+            unknown = [display_id for display_id in display_ids or [] if self.displays.get(display_id) is None]
+            if unknown:
+                raise ValueError(f"Unknown display: {', '.join(unknown)}")
+            return self.displays.broadcast([str(line) for line in lines], display_ids)
+        if method not in DISPLAY_METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        manager = self.displays.get(request.get("display"))
+        if manager is None:
+            raise ValueError(f"Unknown display: {request.get('display')}")
+        if method == 'display_order' and not (args and validate_order_data(args[0])):
+            raise ValueError("Invalid order data format")
+        return getattr(manager, method)(*args)
+
+
+def remove_stale_socket(path: str) -> bool:
+    """Remove the socket of a broker that is gone; False if one still answers"""
+    if not os.path.exists(path):
+        return True
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return False
+    except OSError:
+        os.remove(path)
+        return True
+    finally:
+        probe.close()
+
+
+def setup_logger():
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                  datefmt='%Y-%m-%d %H:%M:%S')
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    for name in (__name__, 'vfd_manager', 'vfd_process', 'vfd_registry'):
+        broker_logger = logging.getLogger(name)
+        broker_logger.setLevel(logging.INFO)
+        broker_logger.handlers = [handler]
+
+
+def main():
+    setup_logger()
+    if not remove_stale_socket(BROKER_SOCKET):
+        logger.error(f"A VFD broker is already listening on {BROKER_SOCKET}")
+        raise SystemExit(1)
+
+    displays = DisplayRegistry()
+    for display_id, ok in displays.test_connections().items():
+        if ok:
+            logger.info(f"VFD {display_id} test successful")
+        else:
+            logger.warning(f"VFD {display_id} test failed - broker will start but this display may not work")
+
+    server = BrokerServer(BROKER_SOCKET, displays)
+    # Stop like on Ctrl+C when a service manager stops the broker
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    logger.info(f"VFD broker listening on {BROKER_SOCKET} for displays: {', '.join(displays.ids())}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Broker shutdown requested")
+    finally:
+        server.server_close()
+        os.remove(BROKER_SOCKET)
+        displays.close()
+        logger.info("Broker stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Thin client of the VFD broker (vfd_broker.py).
+
+The broker is the only process opening the serial ports; web server workers
+and POS processes send it display commands over a Unix domain socket, one
+JSON object per line each way, on a persistent connection per thread.
+Standard library only, so it can be imported anywhere:
+
+    from vfd_client import BrokerClient
+
+    client = BrokerClient()
+    client.display("lane1").display_order(order_items)
+    client.broadcast(["PROMO COCA -50%", "Jusqu au 30 juin"])
+"""
+import itertools
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+BROKER_SOCKET = os.getenv('VFD_BROKER_SOCKET') or os.path.join(tempfile.gettempdir(), 'vfd220_broker.sock')
+BROKER_TIMEOUT = float(os.getenv('VFD_BROKER_TIMEOUT', '15'))  # seconds, covers wait_idle/test_connection
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerError(Exception):
+    """The broker rejected a request"""
+
+
+class BrokerClient:
+    """Connection to the broker; safe to share between threads"""
+
+    def __init__(self, path: Optional[str] = None, timeout: float = BROKER_TIMEOUT):
+        self.path = path or BROKER_SOCKET
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def _connection(self):
+        """This thread's persistent (socket, reader), connecting if needed"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            connection = self._local.connection = (sock, sock.makefile('rb'))
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            connection[1].close()
+            connection[0].close()
+
+    def call(self, method: str, display: Optional[str] = None, *args):
+        """Run a request on the broker and return its result.
+
+        Raises OSError when the broker cannot be reached or does not answer
+        in time, and BrokerError when it rejects the request. The request is
+        only resent when it could not be written to a connection left over
+        from a previous broker, so it never runs twice.
+        """
+        request_id = next(self._ids)
+        request = json.dumps({"id": request_id, "method": method, "display": display, "args": args})
+        for attempt in range(2):
+            reused = getattr(self._local, 'connection', None) is not None
+            sock, reader = self._connection()
+            try:
+                sock.sendall(request.encode('utf-8') + b'\n')
+                break
+            except socket.timeout:
+                self._drop_connection()
+                raise
+            except OSError:
+                # A broker that restarted closed the old connection: nothing was sent
+                self._drop_connection()
+                if attempt or not reused:
+                    raise
+        try:
+            line = reader.readline()
+        except OSError:
+            self._drop_connection()
+            raise
+        if not line:
+            self._drop_connection()
+            raise ConnectionError("Broker closed the connection")
+        reply = json.loads(line)
+        if reply.get('id') != request_id:
+            self._drop_connection()
+            raise ConnectionError(f"Broker reply {reply.get('id')} does not match request {request_id}")
+        if 'error' in reply:
+            raise BrokerError(reply['error'])
+        return reply['result']
+
+    def display(self, display_id: str) -> "BrokerVFDManager":
+        return BrokerVFDManager(self, display_id)
+
+    def displays(self) -> Dict[str, str]:
+        """Display IDs served by the broker, with their ports"""
+        return self.call('displays')
+
+    def broadcast(self, lines: List[str], display_ids: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Show the same lines on several displays (default: all), encoded once"""
+        return self.call('broadcast', None, list(lines), display_ids)
+
+    def close(self):
+        """Close this thread's connection"""
+        self._drop_connection()
+
+
+class BrokerVFDManager:
+    """One display served by the broker, with the interface of VFDManager.
+
+    Commands return False (and log) when the broker is unreachable, like
+    VFDManager does when its queue is full.
+    """
+
+    def __init__(self, client: BrokerClient, name: str):
+        self.client = client
+        self.name = name
+        self._port: Optional[str] = None
+
+    def _request(self, method: str, *args):
+        try:
+            return self.client.call(method, self.name, *args)
+        except (OSError, BrokerError) as e:
+            logger.error(f"VFD broker request {method} for {self.name} failed: {e}")
+            return False
+
+    @property
+    def port(self) -> str:
+        if self._port is None:
+            try:
+                self._port = self.client.displays().get(self.name, "unknown")
+            except (OSError, BrokerError):
+                return "unknown"
+        return self._port
+
+    def health(self) -> Dict[str, object]:
+        try:
+            return self.client.call('health', self.name)
+        except (OSError, BrokerError) as e:
+            return {"state": "broker_down", "connected": False, "error": str(e)}
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        return self._request('wait_idle', *([timeout] if timeout is not None else []))
+
+    def test_connection(self) -> bool:
+        return self._request('test_connection')
+
+    def display_welcome(self) -> bool:
+        return self._request('display_welcome')
+
+    def display_order(self, order_items: List[Dict[str, str]]) -> bool:
+        return self._request('display_order', order_items)
+
+    def display_shared(self, shared) -> bool:
+        """Show a SharedFrame's lines until replaced (the broker encodes them)"""
+        result = self._request('broadcast', list(shared.lines), [self.name])
+        return bool(result and result.get(self.name))
+
+    def deconnect(self):
+        self._request('deconnect')
+
+    def close(self):
+        """Nothing to release: the broker keeps the display"""
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+ESC = 0x1B
+BEL = 0x07
+FF = 0x0C
+CR = 0x0D
+
+
+class VFD220Emulator:
+    """Pure-Python VFD220 that stands in for serial.Serial.
+
+    Accepts the same constructor arguments as serial.Serial, interprets the
+    bytes written to it (0x0C clear, ESC L cursor, BEL and ESC B beeps, and
+    the CD5220-style ESC Q A/B line writes and ESC Q D upper-line marquee)
+    and keeps a virtual screen. With model_timing enabled, write() blocks for as
+    long as the bytes would take on the wire at the configured baud rate.
+
+    device_baudrate fixes the rate the emulated device listens at (None = any);
+    bytes sent at another rate arrive as noise. With echo enabled the device
+    sends back every byte it receives, which makes baud rate probing testable.
+    """
+
+    def __init__(self, port=None, baudrate=9600, bytesize=8, parity='N', stopbits=1,
+                 timeout=None, display_width=None, display_height=None, model_timing=None,
+                 device_baudrate=None, echo=None, **kwargs):
+        self.port = port
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.timeout = timeout
+
+        self.display_width = display_width or int(os.getenv('VFD_WIDTH', '20'))
+        self.display_height = display_height or int(os.getenv('VFD_HEIGHT', '2'))
+        if model_timing is None:
+            model_timing = os.getenv('VFD_EMULATOR_TIMING', 'False').lower() == 'true'
+        self.model_timing = model_timing
+        if device_baudrate is None and os.getenv('VFD_EMULATOR_BAUD'):
+            device_baudrate = int(os.getenv('VFD_EMULATOR_BAUD'))
+        self.device_baudrate = device_baudrate
+        if echo is None:
+            echo = os.getenv('VFD_EMULATOR_ECHO', 'False').lower() == 'true'
+        self.echo = echo
+
+        self.is_open = True
+        self.beeps = 0
+        self.bytes_written = 0
+        self.write_count = 0
+        self._lock = threading.Lock()
+        self._pending = bytearray()  # incomplete escape sequence
+        self._input = bytearray()  # bytes sent back by the device
+        self._screen = []
+        self._cursor = 0
+        self.marquee = None  # text scrolled by the firmware on the upper line
+        self._clear()
+
+    @property
+    def in_waiting(self):
+        self._check_open()
+        return len(self._input)
+
+    def _check_open(self):
+        if not self.is_open:
+            raise OSError("Emulated port is closed")
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def flush(self):
+        self._check_open()
+
+    def reset_input_buffer(self):
+        self._check_open()
+        with self._lock:
+            self._input.clear()
+
+    def reset_output_buffer(self):
+        self._check_open()
+
+    def read(self, size=1):
+        """Return echoed bytes, or behave like a read that times out"""
+        self._check_open()
+        with self._lock:
+            if self._input:
+                data = bytes(self._input[:size])
+                del self._input[:size]
+                return data
+        if self.timeout:
+            time.sleep(self.timeout)
+        return b''
+
+    def write(self, data):
+        self._check_open()
+        data = bytes(data)
+        with self._lock:
+            if self.device_baudrate not in (None, self.baudrate):
+                # Wrong line speed: the device only sees noise
+                data_seen = bytes(byte ^ 0xFF for byte in data)
+            else:
+                data_seen = data
+                for byte in data:
+                    self._feed(byte)
+            if self.echo:
+                self._input += data_seen
+            self.bytes_written += len(data)
+            self.write_count += 1
+        if self.model_timing:
+            time.sleep(len(data) * self.byte_time())
+        return len(data)
+
+    def byte_time(self):
+        """Seconds needed to send one byte (start bit + data + parity + stop bits)"""
+        bits = 1 + self.bytesize + (0 if self.parity == 'N' else 1) + self.stopbits
+        return bits / self.baudrate
+
+    def get_lines(self):
+        """Return the virtual screen as a list of strings"""
+        with self._lock:
+            return [row.decode('ascii') for row in self._screen]
+
+    def _clear(self):
+        self._screen = [bytearray(b' ' * self.display_width) for _ in range(self.display_height)]
+        self._cursor = 0
+        self.marquee = None
+
+    def _feed(self, byte):
+        """Interpret one byte of the VFD220 command stream"""
+        if self._pending:
+            self._pending.append(byte)
+            command = self._pending[1]
+            if command == ord('L'):
+                if len(self._pending) < 3:
+                    return
+                self._cursor = self._pending[2] % (self.display_width * self.display_height)
+            elif command == ord('B'):
+                self.beeps += 1
+            elif command == ord('Q'):
+                if byte != CR:
+                    return
+                self._string_command(self._pending[2:3], bytes(self._pending[3:-1]))
+            self._pending.clear()
+        elif byte == ESC:
+            self._pending.append(byte)
+        elif byte == FF:
+            self._clear()
+        elif byte == BEL:
+            self.beeps += 1
+        elif 0x20 <= byte < 0x7F:
+            row, col = divmod(self._cursor, self.display_width)
+            self._screen[row][col] = byte
+            self._cursor = (self._cursor + 1) % (self.display_width * self.display_height)
+
+    def _string_command(self, mode, text):
+        """ESC Q A/B write the upper/lower line, ESC Q D scrolls the upper line"""
+        line = text[:self.display_width].ljust(self.display_width)
+        if mode == b'A':
+            self._screen[0][:] = line
+        elif mode == b'B' and self.display_height > 1:
+            self._screen[1][:] = line
+        elif mode == b'D':
+            self.marquee = text.decode('ascii', 'replace')
+            self._screen[0][:] = line
@@ -0,0 +1,173 @@
+"""Shared-memory copy of what a display is showing.
+
+The process owning a VFD220 port publishes every screen change into a small
+memory-mapped file named after the display (in VFD_SHARED_FRAMEBUFFER_DIR);
+any other process (the status endpoint, other server workers, monitoring
+tools) can map it and read the current screen without asking the owner. A
+file mapping rather than multiprocessing.shared_memory keeps the segment out
+of the multiprocessing resource tracker, which would otherwise unlink it when
+a reader exits.
+
+Layout: a header (sequence number, width, height, known flag, update time)
+followed by width * height ASCII cells. Updates are guarded by a seqlock:
+the writer makes the sequence number odd while it writes the cells and even
+again afterwards, and readers retry until they see the same even number
+before and after copying the cells.
+
+    python vfd_framebuffer.py lane1 lane2 --watch 0.5
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+SHARED_FRAMEBUFFER = os.getenv('VFD_SHARED_FRAMEBUFFER', 'False').lower() == 'true'
+SHARED_FRAMEBUFFER_DIR = os.getenv('VFD_SHARED_FRAMEBUFFER_DIR') or tempfile.gettempdir()
+
+# seq, width, height, known, update time (time.time())
+HEADER = struct.Struct('<QHHB3xd')
+SEQ = struct.Struct('<Q')
+READ_RETRIES = 100
+
+logger = logging.getLogger(__name__)
+
+
+def framebuffer_path(display_id: str) -> str:
+    return os.path.join(SHARED_FRAMEBUFFER_DIR, f"vfd220_{display_id}.fb")
+
+
+class SharedFramebuffer:
+    """One display's screen in shared memory; create() to publish, attach() to read"""
+
+    def __init__(self, path: str, fd: int, buf: mmap.mmap, owner: bool):
+        self.path = path
+        self._fd = fd
+        self._buf = buf
+        self._owner = owner
+        self._lock = threading.Lock()
+        self.inode = os.fstat(fd).st_ino
+
+    @classmethod
+    def create(cls, display_id: str, width: int, height: int) -> "SharedFramebuffer":
+        """Create the mapping of a display, as its writer.
+
+        A file left by a previous owner (e.g. a restarted worker process) is
+        reused in place, so readers that already mapped it keep working.
+        """
+        path = framebuffer_path(display_id)
+        size = HEADER.size + width * height
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(fd).st_size != size:
+            os.ftruncate(fd, size)
+        framebuffer = cls(path, fd, mmap.mmap(fd, size), owner=True)
+        HEADER.pack_into(framebuffer._buf, 0, 0, width, height, 0, time.time())
+        return framebuffer
+
+    @classmethod
+    def attach(cls, display_id: str) -> Optional["SharedFramebuffer"]:
+        """Map a display's framebuffer for reading (None if nobody publishes it)"""
+        path = framebuffer_path(display_id)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        if os.fstat(fd).st_size < HEADER.size:
+            os.close(fd)
+            return None
+        return cls(path, fd, mmap.mmap(fd, 0, access=mmap.ACCESS_READ), owner=False)
+
+    def publish(self, lines: Optional[List[str]]):
+        """Writer: store the screen (None = contents unknown)"""
+        buf = self._buf
+        with self._lock:
+            seq, width, height, _, _ = HEADER.unpack_from(buf, 0)
+            SEQ.pack_into(buf, 0, seq + 1)  # odd: update in progress
+            if lines is not None:
+                cells = ''.join(line[:width].ljust(width) for line in lines[:height]).ljust(width * height)
+                buf[HEADER.size:HEADER.size + width * height] = cells.encode('ascii', 'replace')
+            HEADER.pack_into(buf, 0, seq + 2, width, height, lines is not None, time.time())
+
+    def read(self) -> Optional[Dict[str, object]]:
+        """Reader: consistent snapshot {"lines", "updated", "seq"}, or None if the screen is unknown"""
+        buf = self._buf
+        for _ in range(READ_RETRIES):
+            seq, width, height, known, updated = HEADER.unpack_from(buf, 0)
+            if seq % 2:
+                continue
+            cells = bytes(buf[HEADER.size:HEADER.size + width * height])
+            if SEQ.unpack_from(buf, 0)[0] != seq:
+                continue
+            if not known:
+                return None
+            text = cells.decode('ascii', 'replace')
+            return {
+                "lines": [text[row * width:(row + 1) * width] for row in range(height)],
+                "updated": updated,
+                "seq": seq // 2,
+            }
+        logger.warning(f"Shared framebuffer {self.path} kept changing while being read")
+        return None
+
+    def close(self):
+        """Unmap; the writer also removes the file"""
+        self._buf.close()
+        os.close(self._fd)
+        if self._owner:
+            try:
+                os.remove(self.path)
+            except OSError:  # already gone, or still mapped on Windows
+                pass
+
+
+_readers: Dict[str, SharedFramebuffer] = {}
+_readers_lock = threading.Lock()  # request threads share the reader mappings
+
+
+def read_screen(display_id: str) -> Optional[Dict[str, object]]:
+    """Current screen of a display from shared memory (None if unavailable)"""
+    with _readers_lock:
+        reader = _readers.get(display_id)
+        if reader is not None:
+            try:
+                current = os.stat(reader.path).st_ino
+            except OSError:
+                current = None
+            if current != reader.inode:  # owner gone, or replaced by a new one
+                del _readers[display_id]
+                reader.close()
+                reader = None
+        if reader is None:
+            reader = SharedFramebuffer.attach(display_id)
+            if reader is None:
+                return None
+            _readers[display_id] = reader
+        return reader.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print what VFD displays are showing")
+    parser.add_argument('displays', nargs='*', default=['default'], help="display IDs (default: default)")
+    parser.add_argument('--watch', type=float, default=None, help="refresh every WATCH seconds")
+    args = parser.parse_args()
+
+    while True:
+        for display_id in args.displays:
+            screen = read_screen(display_id)
+            if screen is None:
+                print(f"[{display_id}] (unknown)")
+                continue
+            for line in screen["lines"]:
+                print(f"[{display_id}] |{line}|")
+        if args.watch is None:
+            return
+        time.sleep(args.watch)
+        print()
+
+
+if __name__ == '__main__':
+    main()
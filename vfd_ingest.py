@@ -0,0 +1,135 @@
+"""Compact order ingestion on a Unix socket and on localhost UDP.
+
+A scanner or POS process sends the whole order on one line, with no HTTP or
+JSON around it. Fields are separated by tabs:
+
+    <display>\t<date>\t<name>\t<price>\t<quantity>[\t<name>\t<price>\t<quantity>...]\n
+
+An empty <display> means the default display. Every item gets <date>, as in
+the JSON orders of /api/receive_order. On the Unix socket (a stream, any
+number of lines per connection) each line is answered with "OK\n" or
+"ERR <reason>\n". UDP datagrams (one or more lines each) get no reply.
+
+    from vfd_ingest import format_order_line
+    sock.sendto(format_order_line(items, "lane1"), ("127.0.0.1", 8087))
+"""
+import logging
+import os
+import socketserver
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from vfd_broker import remove_stale_socket
+
+INGEST_SOCKET = os.getenv('VFD_INGEST_SOCKET', '')  # empty = disabled
+INGEST_UDP_PORT = os.getenv('VFD_INGEST_UDP_PORT', '')  # empty = disabled
+INGEST_UDP_HOST = '127.0.0.1'
+MAX_DATAGRAM = 65507
+
+logger = logging.getLogger(__name__)
+
+OrderHandler = Callable[[List[Dict[str, str]], Optional[str]], bool]
+
+
+def parse_order_line(line: str) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """(display ID or None, order items) of one protocol line; ValueError if malformed"""
+    fields = line.rstrip('\r\n').split('\t')
+    if len(fields) < 5 or (len(fields) - 2) % 3:
+        raise ValueError("Expected display, date and name/price/quantity triplets")
+    display_id, date = fields[0], fields[1]
+    items = [{"name": fields[i], "price": fields[i + 1], "quantity": fields[i + 2], "date": date}
+             for i in range(2, len(fields), 3)]
+    return display_id or None, items
+
+
+def _field(value) -> str:
+    """A value as one protocol field: separators and line breaks become spaces"""
+    return str(value).replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def format_order_line(items: List[Dict[str, str]], display_id: Optional[str] = None) -> bytes:
+    """Protocol line of an order (the date is taken from its first item)"""
+    fields = [display_id or '', _field(items[0].get('date', '')) if items else '']
+    for item in items:
+        fields += [_field(item['name']), str(item['price']), str(item.get('quantity', 1))]
+    return ('\t'.join(fields) + '\n').encode('utf-8')
+
+
+class StreamIngestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                display_id, items = parse_order_line(line.decode('utf-8'))
+                reply = b"OK\n" if self.server.on_order(items, display_id) else b"ERR Failed to display order\n"
+            except ValueError as e:
+                reply = f"ERR {e}\n".encode('utf-8')
+            try:
+                self.wfile.write(reply)
+            except OSError:
+                return
+
+
+class DatagramIngestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        for line in self.request[0].decode('utf-8', 'replace').splitlines():
+            try:
+                display_id, items = parse_order_line(line)
+            except ValueError as e:
+                logger.warning(f"Ignoring malformed order datagram from {self.client_address}: {e}")
+                continue
+            self.server.on_order(items, display_id)
+
+
+class UnixIngestServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class UDPIngestServer(socketserver.UDPServer):
+    max_packet_size = MAX_DATAGRAM
+
+
+class OrderIngest:
+    """Ingestion servers feeding each order to on_order(items, display_id)"""
+
+    def __init__(self, on_order: OrderHandler, socket_path: str = INGEST_SOCKET,
+                 udp_port: str = INGEST_UDP_PORT):
+        self.on_order = on_order
+        self.socket_path = socket_path
+        self.udp_port = int(udp_port) if udp_port else None
+        self._servers: List[socketserver.BaseServer] = []
+
+    def start(self) -> bool:
+        """Start the configured servers (False if one could not be started)"""
+        ok = True
+        if self.socket_path:
+            if remove_stale_socket(self.socket_path):
+                self._serve(UnixIngestServer(self.socket_path, StreamIngestHandler))
+                logger.info(f"Order ingestion listening on {self.socket_path}")
+            else:
+                logger.error(f"Order ingestion socket {self.socket_path} is already in use")
+                ok = False
+        if self.udp_port is not None:
+            try:
+                self._serve(UDPIngestServer((INGEST_UDP_HOST, self.udp_port), DatagramIngestHandler))
+                logger.info(f"Order ingestion listening on udp://{INGEST_UDP_HOST}:{self.udp_port}")
+            except OSError as e:
+                logger.error(f"Error starting UDP order ingestion on port {self.udp_port}: {e}")
+                ok = False
+        return ok
+
+    def _serve(self, server: socketserver.BaseServer):
+        server.on_order = self.on_order
+        self._servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True,
+                         name=f"VFD-Ingest-{type(server).__name__}").start()
+
+    def close(self):
+        """Stop the servers and remove the Unix socket"""
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            if isinstance(server, UnixIngestServer):
+                try:
+                    os.remove(self.socket_path)
+                except OSError:
+                    pass
+        self._servers = []
@@ -0,0 +1,402 @@
+import logging
+import threading
+import time
+import queue
+import random
+from datetime import datetime, timezone
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, List, Dict, Optional
+from vfd220 import VFD220, SharedFrame
+from vfd_framebuffer import SHARED_FRAMEBUFFER, SharedFramebuffer
+from order_display import DISPLAY_TIMEOUT, build_order_lines, to_date, welcome_lines
+
+VFD_TIMEOUT = 5  # seconds
+VFD_QUEUE_SIZE = 32  # pending display commands
+HEALTH_CHECK_INTERVAL = 2  # seconds between link checks
+RECONNECT_MIN_DELAY = 0.5  # seconds, first reconnect backoff
+RECONNECT_MAX_DELAY = 30  # seconds, backoff cap
+STATUS_TTL = 1  # seconds a health snapshot is reused by /api/status
+
+logger = logging.getLogger(__name__)
+
+
+def reconnect_delay(attempts: int) -> float:
+    """Jittered exponential backoff after attempts failed reconnects"""
+    delay = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * 2 ** (attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def link_snapshot(link_state: str, connected: bool, reconnect_attempts: int,
+                  next_reconnect: float) -> Dict[str, object]:
+    """Link part of a display pipeline's health (next_reconnect is a monotonic time)"""
+    state = {
+        "state": link_state,
+        "connected": connected,
+        "reconnect_attempts": reconnect_attempts,
+    }
+    if link_state == "disconnected":
+        state["next_reconnect_in"] = round(max(0.0, next_reconnect - time.monotonic()), 3)
+    return state
+
+
+def health_snapshot(link: Dict[str, object], last_write: Optional[float], queue_depth: int) -> Dict[str, object]:
+    """Health of a display pipeline as reported by /api/status"""
+    health = dict(link)
+    health["last_write"] = datetime.fromtimestamp(last_write, tz=timezone.utc).isoformat() if last_write else None
+    health["last_write_age"] = round(time.time() - last_write, 3) if last_write else None
+    health["queue_depth"] = queue_depth
+    return health
+
+
+class VFDManager:
+    """Manages one persistent VFD display connection.
+
+    All serial I/O happens on one long-lived writer thread that owns the
+    VFD220 handle and drains a bounded queue of display commands, so
+    callers only enqueue and never wait on the serial port. The same thread
+    reverts an order to the welcome screen once DISPLAY_TIMEOUT expires, and
+    supervises the link: it checks its health every HEALTH_CHECK_INTERVAL and
+    reconnects in the background with jittered exponential backoff, redrawing
+    the current screen once the display is back.
+    """
+
+    def __init__(self, vfd: Optional[VFD220] = None, name: str = "default"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._dates = []
+        self._vfd = vfd or VFD220()
+        if SHARED_FRAMEBUFFER:
+            self._share_framebuffer()
+        self._connected = False
+        self._revert_deadline: Optional[float] = None
+        # Link supervision: "connected", "connecting", "disconnected" or "closed"
+        self._link_state = "disconnected"
+        self._reconnect_attempts = 0
+        self._next_reconnect = 0.0
+        self._next_health_check = 0.0
+        self._screen: Optional[tuple] = None  # last screen command, redrawn after reconnect
+        self._last_write_time: Optional[float] = None
+        self._health: Optional[Dict[str, object]] = None
+        self._health_time = 0.0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=VFD_QUEUE_SIZE)
+        # Screen command waiting to be drawn: (command, args, futures); latest wins
+        self._pending_screen: Optional[tuple] = None
+        self._pending_lock = threading.Lock()
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop,
+            daemon=True,
+            name=f"VFD-Writer-{name}"
+        )
+        self._writer_thread.start()
+
+    def _share_framebuffer(self):
+        """Publish the screen to the display's shared-memory framebuffer"""
+        try:
+            self._vfd.shared_framebuffer = SharedFramebuffer.create(
+                self.name, self._vfd.display_width, self._vfd.display_height)
+        except OSError as e:
+            logger.error(f"Could not create shared framebuffer for VFD {self.name}: {e}")
+
+    def _submit(self, command: Callable, *args) -> Optional[Future]:
+        """Enqueue a command for the writer thread without blocking.
+
+        Screen commands do not take a queue slot each: they replace the screen
+        waiting to be drawn (latest wins), and only the first one of a run
+        queues a _draw_pending_screen. A burst of orders can therefore never
+        fill the queue and get the newest one dropped.
+        """
+        future: Future = Future()
+        if self._is_screen_command(command):
+            with self._pending_lock:
+                pending = self._pending_screen
+                if pending is not None:
+                    self._pending_screen = (command, args, pending[2] + [future])
+                    return future
+                if not self._enqueue(self._draw_pending_screen, (), Future()):
+                    return None
+                self._pending_screen = (command, args, [future])
+                return future
+        return future if self._enqueue(command, args, future) else None
+
+    def _enqueue(self, command: Callable, args: tuple, future: Future) -> bool:
+        try:
+            self._queue.put_nowait((command, args, future))
+            return True
+        except queue.Full:
+            logger.warning(f"VFD {self.name} command queue full, dropping {command.__name__}")
+            return False
+
+    def _call(self, command: Callable, *args, timeout: float = VFD_TIMEOUT) -> bool:
+        """Enqueue a command and wait for the writer thread to run it"""
+        future = self._submit(command, *args)
+        if future is None:
+            return False
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.error(f"Timed out waiting for VFD {self.name} command {command.__name__}")
+            return False
+
+    def _writer_loop(self):
+        """Run queued display commands; the only place touching the serial port.
+
+        Timers (revert, link supervision) run between commands.
+        """
+        while True:
+            self._run_timers()
+            try:
+                command, args, future = self._queue.get(timeout=self._next_timer_delay())
+            except queue.Empty:
+                continue
+            future.set_result(self._run_command(command, args))
+
+    def _draw_pending_screen(self) -> bool:
+        """Writer thread: draw the newest screen command submitted so far.
+
+        Screen commands it superseded resolve with its result.
+        """
+        with self._pending_lock:
+            command, args, futures = self._pending_screen
+            self._pending_screen = None
+        self._screen = (command, args)
+        result = self._run_command(command, args)
+        for future in futures:
+            future.set_result(result)
+        if len(futures) > 1:
+            logger.debug(f"Coalesced {len(futures) - 1} superseded display commands")
+        return result
+
+    def _run_timers(self):
+        """Writer thread: fire the revert and link supervision timers that are due"""
+        if self._revert_deadline is not None and time.monotonic() >= self._revert_deadline:
+            self._screen = (self._show_welcome, ())
+            self._run_command(self._revert_to_welcome, ())
+        self._supervise_link()
+
+    def _next_timer_delay(self) -> Optional[float]:
+        """Seconds until the next timer is due (None = only wake up for commands)"""
+        deadlines = []
+        if self._revert_deadline is not None:
+            deadlines.append(self._revert_deadline)
+        if self._link_state == "connected":
+            deadlines.append(self._next_health_check)
+        elif self._link_state == "disconnected":
+            deadlines.append(self._next_reconnect)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def _supervise_link(self):
+        """Writer thread: check link health and reconnect with backoff"""
+        now = time.monotonic()
+        if self._link_state == "connected":
+            if now >= self._next_health_check:
+                self._next_health_check = now + HEALTH_CHECK_INTERVAL
+                if not self._vfd.is_connected():
+                    logger.warning(f"VFD {self.name} link lost, reconnecting in the background")
+                    self._link_down()
+        elif self._link_state == "disconnected" and now >= self._next_reconnect:
+            self._reconnect()
+
+    def _link_down(self):
+        """Writer thread: mark the link down and schedule an immediate reconnect"""
+        self._connected = False
+        self._link_state = "disconnected"
+        self._reconnect_attempts = 0
+        self._next_reconnect = time.monotonic()
+
+    def _reconnect(self, redraw: bool = True):
+        """Writer thread: one reconnect attempt, rescheduling with jittered backoff"""
+        self._link_state = "connecting"
+        self._vfd.disconnect()
+        if self._connect():
+            self._link_state = "connected"
+            self._reconnect_attempts = 0
+            self._next_health_check = time.monotonic() + HEALTH_CHECK_INTERVAL
+            logger.info(f"VFD {self.name} link up on {self._vfd.port}")
+            if redraw and self._screen is not None:
+                command, args = self._screen
+                self._run_command(command, args)
+            return
+
+        self._reconnect_attempts += 1
+        delay = reconnect_delay(self._reconnect_attempts)
+        self._link_state = "disconnected"
+        self._next_reconnect = time.monotonic() + delay
+        logger.warning(f"VFD {self.name} reconnect attempt {self._reconnect_attempts} failed, retrying in {delay:.1f}s")
+
+    def _is_screen_command(self, command: Callable) -> bool:
+        """Whether a command redraws the whole screen (and can be superseded)"""
+        return command in (self._show_welcome, self._show_order, self._show_lines, self._show_shared)
+
+    def _revert_delay(self) -> Optional[float]:
+        """Seconds until the displayed order reverts to welcome (None = never)"""
+        if self._revert_deadline is None:
+            return None
+        return max(0.0, self._revert_deadline - time.monotonic())
+
+    def _run_command(self, command: Callable, args: tuple) -> bool:
+        """Run a single command on the writer thread"""
+        try:
+            return command(*args)
+        except Exception as e:
+            logger.error(f"Error in VFD {self.name} command {command.__name__}: {e}")
+            self._link_down()
+            return False
+
+    def _connect(self) -> bool:
+        """Establish connection if not already connected"""
+        if not self._connected:
+            try:
+                self._connected = self._vfd.connect()
+                if not self._connected:
+                    logger.error("Failed to connect to VFD display")
+            except PermissionError as e:
+                logger.error(f"PermissionError: Cannot open serial port (maybe already in use or insufficient permissions): {e}")
+                self._connected = False
+            except Exception as e:
+                logger.error(f"Exception during VFD connect: {e}")
+                self._connected = False
+        return self._connected
+
+    def _ensure_connection(self) -> bool:
+        """Writer thread: whether the link is usable, without blocking on reconnects.
+
+        A link closed by deconnect() is reopened on the next display command.
+        """
+        if self._link_state == "closed":
+            self._link_state = "disconnected"
+            self._reconnect(redraw=False)
+        return self._connected
+
+    def _check_write(self) -> bool:
+        """Writer thread: detect a link that failed during a write"""
+        if self._vfd.is_connected():
+            self._last_write_time = time.time()
+            return True
+        logger.warning(f"VFD {self.name} link lost during write, reconnecting in the background")
+        self._link_down()
+        return False
+
+    def _show_welcome(self) -> bool:
+        """Writer thread: draw the welcome message"""
+        self._revert_deadline = None
+        if not self._ensure_connection():
+            return False
+        self._vfd.send_multiline_text(welcome_lines(self._vfd.display_width, self._vfd.display_height))
+        return self._check_write()
+
+    def _show_lines(self, lines: List[str]) -> bool:
+        """Writer thread: draw pre-formatted lines"""
+        if not self._ensure_connection():
+            return False
+        self._vfd.send_multiline_text(lines)
+        return self._check_write()
+
+    def _show_shared(self, shared: SharedFrame) -> bool:
+        """Writer thread: draw a broadcast frame shared with other displays"""
+        self._revert_deadline = None
+        if not self._ensure_connection():
+            return False
+        self._vfd.send_shared_frame(shared)
+        return self._check_write()
+
+    def _show_order(self, lines: List[str]) -> bool:
+        """Writer thread: draw an order and arm the revert to welcome"""
+        self._revert_deadline = time.monotonic() + DISPLAY_TIMEOUT
+        return self._show_lines(lines)
+
+    def _revert_to_welcome(self) -> bool:
+        """Writer thread: the order display timed out"""
+        logger.debug("Display timeout reached, reverting to welcome message")
+        return self._show_welcome()
+
+    def _barrier(self) -> bool:
+        """Writer thread: no-op used to wait for the queue to drain"""
+        return True
+
+    def _disconnect(self) -> bool:
+        """Writer thread: close the serial port and pause supervision"""
+        self._vfd.disconnect()
+        self._connected = False
+        self._link_state = "closed"
+        return True
+
+    @property
+    def port(self) -> str:
+        return self._vfd.port
+
+    def connection_state(self) -> Dict[str, object]:
+        """Report the link state maintained by the supervisor"""
+        return link_snapshot(self._link_state, self._connected, self._reconnect_attempts, self._next_reconnect)
+
+    def health(self) -> Dict[str, object]:
+        """Cached health snapshot (link state, last write, queue depth).
+
+        Built from state the writer thread already maintains, so it never
+        touches the display; a snapshot is reused for STATUS_TTL seconds.
+        """
+        now = time.monotonic()
+        health = self._health
+        if health is None or now - self._health_time >= STATUS_TTL:
+            health = health_snapshot(self.connection_state(), self._last_write_time, self._queue.qsize())
+            self._health = health
+            self._health_time = now
+        return health
+
+    def wait_idle(self, timeout: float = VFD_TIMEOUT) -> bool:
+        """Block until every command queued so far has been written"""
+        return self._call(self._barrier, timeout=timeout)
+
+    def test_connection(self) -> bool:
+        """Test VFD display connection (waits for the writer thread)"""
+        return self._call(self._show_welcome)
+
+    def display_welcome(self) -> bool:
+        """Queue the welcome message for display"""
+        with self._lock:
+            self._dates.clear()
+        return self._submit(self._show_welcome) is not None
+    
+    def exist_date_sup(self,date_verif):
+        for date in self._dates:
+            if date_verif < date:
+                return True
+        return False
+    
+    def display_order(self, order_items: List[Dict[str, str]]) -> bool:
+        """Queue an order for display"""
+        if not order_items:
+            logger.warning("No order items to display")
+            return False
+
+        date = order_items[0].get('date')
+        with self._lock:
+            try:
+                # Orders without a date (e.g. single scans) skip the ordering check
+                if date:
+                    date = to_date(date)
+                    if self.exist_date_sup(date):
+                        logger.warning("Order date is earlier than the last displayed order, skipping display")
+                        return False
+                    self._dates.append(date)
+                lines = build_order_lines(order_items)
+            except Exception as e:
+                logger.error(f"Error displaying order: {e}")
+                return False
+
+        return self._submit(self._show_order, lines) is not None
+            
+    def display_shared(self, shared: SharedFrame) -> bool:
+        """Queue a broadcast frame for display (shown until replaced)"""
+        return self._submit(self._show_shared, shared) is not None
+
+    def deconnect(self):
+        self._call(self._disconnect)
+
+    def close(self):
+        """Close the port and remove the shared framebuffer (server shutdown)"""
+        self.deconnect()
+        if self._vfd.shared_framebuffer is not None:
+            self._vfd.shared_framebuffer.close()
+            self._vfd.shared_framebuffer = None
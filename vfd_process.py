@@ -0,0 +1,224 @@
+"""Display pipeline running in its own process.
+
+ProcessVFDManager has the interface of VFDManager, but the VFD220 and its
+VFDManager live in a worker process: serial writes, the connect() probing
+sleeps and timed effects never compete with the web server for the GIL.
+Requests go to the worker through a multiprocessing queue; a collector
+thread resolves their results and keeps the health snapshot the worker
+publishes every STATUS_TTL, so health() never waits on the worker.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+from vfd220 import SharedFrame
+from vfd_manager import VFD_TIMEOUT, VFD_QUEUE_SIZE, STATUS_TTL
+
+# VFDManager methods that wait for its writer thread; run off the request loop
+BLOCKING_METHODS = ('test_connection', 'wait_idle', 'deconnect')
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(name: str, config: Dict, requests, replies):
+    """Worker process: own the display and serve requests until None arrives"""
+    from vfd220 import VFD220
+    from vfd_manager import VFDManager
+
+    # Console logging, unless re-importing the server's main module configured it
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                  datefmt='%Y-%m-%d %H:%M:%S')
+    for logger_name in ('vfd_manager', __name__):
+        worker_logger = logging.getLogger(logger_name)
+        if not worker_logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(formatter)
+            worker_logger.addHandler(handler)
+            worker_logger.setLevel(logging.INFO)
+    manager = VFDManager(VFD220(**config), name=name)
+    stop = threading.Event()
+
+    def publish_health():
+        while True:
+            replies.put((None, manager.health()))
+            if stop.wait(STATUS_TTL):
+                return
+
+    def run(request_id, method, args):
+        try:
+            result = getattr(manager, method)(*args)
+        except Exception as e:
+            logger.error(f"Error in VFD {name} worker request {method}: {e}")
+            result = False
+        replies.put((request_id, result))
+
+    threading.Thread(target=publish_health, daemon=True, name=f"VFD-Health-{name}").start()
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        if request[1] in BLOCKING_METHODS:
+            threading.Thread(target=run, args=request, daemon=True).start()
+        else:
+            run(*request)
+    stop.set()
+    manager.close()
+
+
+class ProcessVFDManager:
+    """VFDManager in a worker process, restarted if the worker dies"""
+
+    def __init__(self, config: Optional[Dict] = None, name: str = "default"):
+        self.name = name
+        self._config = dict(config or {})
+        self._port = self._config.get('port') or os.getenv('VFD_PORT', 'COM4')
+        # spawn: forking a process that already runs threads is unsafe
+        self._context = multiprocessing.get_context('spawn')
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}  # requests sent to the current worker
+        self._health: Optional[Dict[str, object]] = None
+        self._start_lock = threading.Lock()
+        self._process = None
+        self._start_worker()
+
+    def _start_worker(self):
+        """(Re)start the worker process and the thread collecting its replies"""
+        if self._process is not None:
+            self._retire_worker()
+        self._requests = self._context.Queue(maxsize=VFD_QUEUE_SIZE)
+        self._replies = self._context.Queue()
+        self._pending = {}
+        self._health = None
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(self.name, self._config, self._requests, self._replies),
+            daemon=True,
+            name=f"VFD-Worker-{self.name}"
+        )
+        self._process.start()
+        threading.Thread(target=self._collect, args=(self._process, self._replies, self._pending), daemon=True,
+                         name=f"VFD-Collector-{self.name}").start()
+        logger.info(f"VFD {self.name} worker process started (pid {self._process.pid})")
+
+    def _retire_worker(self):
+        """Stop the collector of the previous worker and fail its requests"""
+        self._fail_pending(self._pending)
+        try:
+            self._replies.put(None)  # wakes the collector, which exits
+        except (OSError, ValueError):
+            pass
+        for worker_queue in (self._requests, self._replies):
+            worker_queue.close()
+            worker_queue.cancel_join_thread()
+
+    def _fail_pending(self, pending: Dict[int, Future]):
+        """Resolve the requests a dead worker will never answer"""
+        for request_id in list(pending):
+            future = pending.pop(request_id, None)
+            if future is not None:
+                future.set_result(False)
+
+    def _collect(self, process, replies, pending: Dict[int, Future]):
+        """Collector thread: resolve request futures and store health snapshots"""
+        while True:
+            try:
+                reply = replies.get(timeout=STATUS_TTL)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                logger.warning(f"VFD {self.name} worker process exited ({process.exitcode})")
+                self._fail_pending(pending)
+                return
+            except (EOFError, OSError, ValueError):
+                self._fail_pending(pending)
+                return
+            if reply is None:  # worker retired
+                return
+            request_id, result = reply
+            if request_id is None:
+                if process is self._process:
+                    self._health = result
+                continue
+            future = pending.pop(request_id, None)
+            if future is not None:
+                future.set_result(result)
+
+    def _request(self, method: str, *args, timeout: float = VFD_TIMEOUT) -> bool:
+        """Run a VFDManager method in the worker and wait for its result"""
+        with self._start_lock:
+            if not self._process.is_alive():
+                logger.warning(f"VFD {self.name} worker process exited ({self._process.exitcode}), restarting")
+                self._start_worker()
+            requests, pending = self._requests, self._pending
+        request_id = next(self._ids)
+        future: Future = Future()
+        pending[request_id] = future
+        try:
+            requests.put_nowait((request_id, method, args))
+        except queue.Full:
+            pending.pop(request_id, None)
+            logger.warning(f"VFD {self.name} worker queue full, dropping {method}")
+            return False
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            pending.pop(request_id, None)
+            logger.error(f"Timed out waiting for VFD {self.name} worker request {method}")
+            return False
+
+    @property
+    def port(self) -> str:
+        return self._port
+
+    def health(self) -> Dict[str, object]:
+        """Latest health snapshot published by the worker (no IPC round trip)"""
+        alive = self._process.is_alive()
+        health = dict(self._health) if self._health is not None else {
+            "state": "starting", "connected": False, "reconnect_attempts": 0,
+            "last_write": None, "last_write_age": None, "queue_depth": 0,
+        }
+        if not alive:
+            health["state"] = "worker_down"
+            health["connected"] = False
+        health["worker_pid"] = self._process.pid
+        health["worker_alive"] = alive
+        return health
+
+    def wait_idle(self, timeout: float = VFD_TIMEOUT) -> bool:
+        """Block until every command queued so far has been written"""
+        return self._request('wait_idle', timeout, timeout=timeout + VFD_TIMEOUT)
+
+    def test_connection(self) -> bool:
+        """Test VFD display connection (waits for the worker)"""
+        return self._request('test_connection', timeout=2 * VFD_TIMEOUT)
+
+    def display_welcome(self) -> bool:
+        return self._request('display_welcome')
+
+    def display_order(self, order_items: List[Dict[str, str]]) -> bool:
+        return self._request('display_order', order_items)
+
+    def display_shared(self, shared: SharedFrame) -> bool:
+        return self._request('display_shared', shared)
+
+    def deconnect(self):
+        self._request('deconnect')
+
+    def close(self, timeout: float = VFD_TIMEOUT):
+        """Stop the worker process, closing its serial port"""
+        try:
+            self._requests.put(None, timeout=timeout)
+            self._process.join(timeout)
+        except queue.Full:
+            logger.warning(f"VFD {self.name} worker queue full, terminating the worker")
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._retire_worker()
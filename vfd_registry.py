@@ -0,0 +1,80 @@
+"""The set of named displays a server drives.
+
+Shared by the Flask server (main.py) and the display broker (vfd_broker.py).
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from vfd220 import VFD220, SharedFrame, load_display_configs
+from vfd_manager import VFDManager
+from vfd_process import ProcessVFDManager
+from vfd_client import BrokerError
+
+# Run each display pipeline in its own worker process
+PROCESS_WORKER = os.getenv('VFD_PROCESS_WORKER', 'False').lower() == 'true'
+
+logger = logging.getLogger(__name__)
+
+
+class DisplayRegistry:
+    """Named displays from load_display_configs(), one VFDManager each.
+
+    Every display has its own writer thread and queue, so a slow or
+    unplugged display never delays the others. With VFD_PROCESS_WORKER the
+    managers are ProcessVFDManagers, each in its own worker process. Given a
+    BrokerClient, the displays (same VFD_DISPLAYS) are the broker's and this
+    process opens no serial port at all.
+    """
+
+    def __init__(self, configs: Optional[Dict[str, Dict]] = None, broker=None):
+        self.broker = broker
+        if configs is None:
+            configs = load_display_configs()
+        if broker is not None:
+            self._managers = {display_id: broker.display(display_id) for display_id in configs}
+        elif PROCESS_WORKER:
+            self._managers = {display_id: ProcessVFDManager(config, name=display_id)
+                              for display_id, config in configs.items()}
+        else:
+            self._managers = {display_id: VFDManager(VFD220(**config), name=display_id)
+                              for display_id, config in configs.items()}
+        self.default_id = next(iter(self._managers))
+
+    def get(self, display_id: Optional[str] = None) -> Optional[VFDManager]:
+        """Manager of a display (the first configured one when no ID is given)"""
+        return self._managers.get(display_id or self.default_id)
+
+    def ids(self) -> List[str]:
+        return list(self._managers)
+
+    def test_connections(self) -> Dict[str, bool]:
+        """Draw the welcome screen on every display in parallel and wait for all"""
+        with ThreadPoolExecutor(max_workers=len(self._managers)) as pool:
+            results = pool.map(lambda manager: manager.test_connection(), self._managers.values())
+            return dict(zip(self._managers, results))
+
+    def broadcast(self, lines: List[str], display_ids: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Queue the same lines on several displays (default: all of them).
+
+        The frame is encoded once and shared, and each display's writer
+        thread writes it concurrently with the others.
+        """
+        if self.broker is not None:
+            try:
+                return self.broker.broadcast(lines, display_ids)
+            except (OSError, BrokerError) as e:
+                logger.error(f"VFD broker broadcast failed: {e}")
+                return {display_id: False for display_id in (display_ids or self._managers)}
+        shared = SharedFrame(lines)
+        return {display_id: self._managers[display_id].display_shared(shared)
+                for display_id in (display_ids or self._managers)}
+
+    def deconnect(self):
+        for manager in self._managers.values():
+            manager.deconnect()
+
+    def close(self):
+        """Shut every display down (server exit)"""
+        for manager in self._managers.values():
+            manager.close()